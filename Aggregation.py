@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+
+from SeriesStore import METRICS
+
+COLUMNS = ['country', 'confirmed', 'deaths', 'recovered', 'DeathRate', 'date', 'Date']
+
+
+def DeathRate(deaths, confirmed):
+    """Deaths as a percentage of confirmed cases, 0 where there are no cases"""
+    deaths = np.asarray(deaths, dtype=np.float64)
+    return np.divide(deaths * 100, confirmed, out=np.zeros(deaths.shape), where=np.asarray(confirmed) != 0)
+
+
+def Aggregate(store):
+    """Sums every metric of every location per country & date into one long format DataFrame
+
+    Rows are ordered by date, then by each country's first appearance in the store, regardless of whether the
+    provinces of a country are adjacent. Locations without a recovered series are left out. The 'date' & 'Date'
+    columns are the store's DateAxis keys & labels.
+    """
+    rows = store.Locations['has_recovered']
+    codes, countries = pd.factorize(store.Locations['country'][rows])
+    stacked = np.stack([store.Series[metric][rows] for metric in METRICS], axis=1)
+    locations, metrics, dates = stacked.shape
+    summed = pd.DataFrame(stacked.reshape(locations, metrics * dates)).groupby(codes).sum().to_numpy()
+    values = summed.reshape(len(countries), metrics, dates).transpose(2, 0, 1).reshape(-1, metrics)
+    table = pd.DataFrame(values, columns=list(METRICS))
+    table.insert(0, 'country', np.tile(np.asarray(countries, dtype=object), dates))
+    table['DeathRate'] = DeathRate(table['deaths'], table['confirmed'])
+    table['date'] = np.repeat(store.Axis.Keys, len(countries))
+    table['Date'] = np.repeat(np.asarray(store.Axis.Labels, dtype=object), len(countries))
+    return table[COLUMNS]
+
+
+def Extend(table, store, start):
+    """Appends the rows of the dates from start onwards to an aggregated table, rebuilding it when start is 0"""
+    if start == 0 or table is None or len(table) == 0:
+        return Aggregate(store)
+    added = Aggregate(store.Slice(start))
+    return pd.concat([table, added], ignore_index=True)
+
+
+class TableIndex(object):
+    """Date offsets & country row positions of an aggregated table
+
+    Aggregate emits the rows of each date contiguously, so a frame is a slice between two offsets & a country
+    is a precomputed array of positions; lookups only touch the rows they return.
+    """
+
+    def __init__(self, table):
+        self.table = table
+        dates = table['date'].to_numpy()
+        starts = np.flatnonzero(np.r_[True, dates[1:] != dates[:-1]]) if len(dates) else np.array([], dtype=int)
+        offsets = np.r_[starts, len(dates)]
+        self.dates = {int(dates[start]): (start, stop) for start, stop in zip(offsets[:-1], offsets[1:])}
+        self.countries = table.groupby('country', sort=False).indices
+
+    def Date(self, date):
+        start, stop = self.dates.get(int(date), (0, 0))
+        return self.table.iloc[start:stop]
+
+    def Country(self, country):
+        return self.table.take(self.countries.get(country, []))
+
+
+def Latest(store):
+    """Sums the latest statistics of every location per country"""
+    locations = store.Locations
+    table = pd.DataFrame({'country': locations['country'].astype(object)})
+    for metric in METRICS:
+        table[metric] = locations[f'latest_{metric}']
+    return table.groupby('country', sort=False, as_index=False).sum()
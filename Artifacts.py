@@ -0,0 +1,120 @@
+import gzip
+import hashlib
+import json
+import os
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+ENCODINGS = ['br', 'gzip'] if brotli is not None else ['gzip']
+EXTENSIONS = {'br': '.br', 'gzip': '.gz'}
+
+
+def InputHash(*inputs):
+    """Content hash of the inputs a generated artifact is built from: DataFrames by content, anything else (file
+    names, settings) by repr"""
+    import pandas as pd
+
+    digest = hashlib.sha1()
+    for value in inputs:
+        if isinstance(value, pd.DataFrame):
+            digest.update(','.join(map(str, value.columns)).encode())
+            digest.update(pd.util.hash_pandas_object(value, index=False).to_numpy().tobytes())
+        else:
+            digest.update(repr(value).encode())
+    return digest.hexdigest()
+
+
+class ArtifactManifest(object):
+    """Remembers the input hash every artifact was last generated from, so unchanged ones can be skipped"""
+
+    def __init__(self, path='artifacts.json'):
+        self.path = path
+        self.hashes = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                self.hashes = json.load(f)
+
+    def Key(self, artifact):
+        """artifact relative to the manifest's directory, so a manifest stays valid when its directory is linked
+        into a new build version (see Publish)"""
+        return os.path.relpath(artifact, os.path.dirname(os.path.abspath(self.path)))
+
+    def IsCurrent(self, artifact, digest):
+        return self.hashes.get(self.Key(artifact)) == digest and os.path.exists(artifact)
+
+    def Record(self, artifact, digest):
+        self.hashes[self.Key(artifact)] = digest
+        WriteAtomic(self.path, json.dumps(self.hashes))
+
+
+def TempFile(filename):
+    """Name of the temporary file filename is written to before replacing it, keeping its extension"""
+    root, extension = os.path.splitext(filename)
+    return f'{root}.{os.getpid()}.tmp{extension}'
+
+
+def WriteAtomic(filename, content):
+    """Replaces filename with content in one step, so no reader ever sees a half written file & other links to
+    the old file (see Publish) keep the old content, content is text or bytes"""
+    temp = TempFile(filename)
+    with open(temp, 'wb' if isinstance(content, bytes) else 'w') as outfile:
+        outfile.write(content)
+    os.replace(temp, filename)
+
+
+class AtomicFile(object):
+    """A file written in place of filename: with AtomicFile(filename) as target: write target.temp (see TempFile)
+
+    The temporary file replaces filename when the block completes & is removed instead when the block raises or
+    calls Discard() (e.g. when cancelled), so filename is never left half written.
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.temp = TempFile(filename)
+        self.discarded = False
+
+    def Discard(self):
+        self.discarded = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exctype, value, traceback):
+        if exctype is not None or self.discarded:
+            if os.path.exists(self.temp):
+                os.remove(self.temp)
+        elif os.path.exists(self.temp):
+            os.replace(self.temp, self.filename)
+        return False
+
+
+def Variant(path, encoding):
+    return path + EXTENSIONS[encoding]
+
+
+def Precompress(path):
+    """Writes the gzip (& brotli, when installed) variants of a generated file next to it"""
+    with open(path, 'rb') as f:
+        content = f.read()
+    for encoding in ENCODINGS:
+        if encoding == 'br':
+            compressed = brotli.compress(content, quality=9)
+        else:
+            compressed = gzip.compress(content, compresslevel=9, mtime=0)
+        WriteAtomic(Variant(path, encoding), compressed)
+
+
+def PrecompressStale(directory, names):
+    """Precompresses the files in names whose variants are missing or older than the file"""
+    for name in names:
+        path = os.path.join(directory, name)
+        if not os.path.exists(path):
+            continue
+        modified = os.stat(path).st_mtime_ns
+        if any(not os.path.exists(Variant(path, encoding)) or os.stat(Variant(path, encoding)).st_mtime_ns < modified
+               for encoding in ENCODINGS):
+            Precompress(path)
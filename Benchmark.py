@@ -0,0 +1,491 @@
+"""Benchmarks for the COVID19 Stats Visualizer
+
+    python Benchmark.py server [--clients 8] [--requests 400]
+    python Benchmark.py api [--clients 8] [--requests 2000]
+    python Benchmark.py startup [--runs 5]
+    python Benchmark.py pipeline [--scales 1 10 100] [--out benchmark.json] [--baseline benchmark_baseline.json]
+                                 [--save-baseline]
+"""
+import argparse
+import http.client
+import json
+import math
+import multiprocessing
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+
+def Percentiles(latencies):
+    latencies = np.asarray(latencies) * 1000
+    return {'p50_ms': float(np.percentile(latencies, 50)), 'p99_ms': float(np.percentile(latencies, 99)),
+            'max_ms': float(latencies.max())}
+
+
+def LoadTest(port, paths, clients=8, requests=400, headers=None, host='127.0.0.1'):
+    """Fetches paths round robin from clients keep-alive connections, returns throughput & latency numbers"""
+    latencies = []
+    transferred = [0]
+    statuses = {}
+    lock = threading.Lock()
+    per_client = max(1, requests // clients)
+
+    def Client(offset):
+        connection = http.client.HTTPConnection(host, port)
+        local = []
+        size = 0
+        codes = {}
+        for i in range(per_client):
+            path = paths[(offset + i) % len(paths)]
+            start = time.perf_counter()
+            connection.request('GET', path, headers=headers or {})
+            response = connection.getresponse()
+            size += len(response.read())
+            local.append(time.perf_counter() - start)
+            codes[response.status] = codes.get(response.status, 0) + 1
+        connection.close()
+        with lock:
+            latencies.extend(local)
+            transferred[0] += size
+            for code, count in codes.items():
+                statuses[code] = statuses.get(code, 0) + count
+
+    threads = [threading.Thread(target=Client, args=(i,)) for i in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    result = {'requests': len(latencies), 'seconds': elapsed, 'requests_per_s': len(latencies) / elapsed,
+              'bytes': transferred[0], 'statuses': statuses}
+    result.update(Percentiles(latencies))
+    return result
+
+
+def BenchmarkServer(clients=8, requests=400, directory='.'):
+    """Load tests the artifact server: plain, compressed & revalidating (If-None-Match) clients"""
+    from Server import ArtifactServer, CHARTS, LIBRARIES
+    from Artifacts import PrecompressStale
+
+    PrecompressStale(directory, CHARTS + LIBRARIES)
+    httpd = ArtifactServer(('127.0.0.1', 0), directory)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    port = httpd.server_address[1]
+    paths = ['/' + name for name in CHARTS + LIBRARIES]
+    connection = http.client.HTTPConnection('127.0.0.1', port)
+    etags = []
+    for path in paths:
+        connection.request('GET', path, headers={'Accept-Encoding': 'gzip, br'})
+        response = connection.getresponse()
+        response.read()
+        etags.append(response.getheader('ETag'))
+    connection.close()
+    results = {
+        'identity': LoadTest(port, paths, clients, requests),
+        'compressed': LoadTest(port, paths, clients, requests, {'Accept-Encoding': 'gzip, br'}),
+        'revalidate': LoadTest(port, paths, clients, requests,
+                               {'Accept-Encoding': 'gzip, br', 'If-None-Match': ', '.join(etags)}),
+    }
+    httpd.shutdown()
+    return results
+
+
+def BenchmarkAPI(clients=8, requests=2000):
+    """Load tests /api/series over the saved series: every query computed (uncached) & answered from the cache"""
+    from urllib.parse import urlencode
+
+    from Query import SeriesQuery
+    from Server import ArtifactServer
+    from Tables import LoadTables
+
+    tables = LoadTables()
+    dates = [str(day) for day in tables.axis.Days]
+    countries = SeriesQuery(tables).Countries()['countries']
+    paths = []
+    for i, country in enumerate(countries):
+        ranges = [{}, {'from': dates[len(dates) // 2]}, {'from': dates[-30], 'to': dates[-1]}]
+        for metric in ('daily', 'cumulative'):
+            paths.append('/api/series?' + urlencode(dict(ranges[i % 3], country=country, metric=metric)))
+    httpd = ArtifactServer(('127.0.0.1', 0), '.')
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    port = httpd.server_address[1]
+    results = {'queries': len(paths)}
+    httpd.queries = SeriesQuery(tables, cache_size=0)
+    results['uncached'] = LoadTest(port, paths, clients, requests)
+    httpd.queries = SeriesQuery(tables, cache_size=len(paths))
+    LoadTest(port, paths, 1, len(paths))
+    results['cached'] = LoadTest(port, paths, clients, requests)
+    httpd.shutdown()
+    return results
+
+
+# Runs in a fresh interpreter: times importing the app, constructing the window, its first paint & the tables
+# being loaded, all from the start of the script
+STARTUP_PROBE = """
+import json, os, time
+start = time.perf_counter()
+import COVID19Stats
+imported = time.perf_counter()
+from PyQt5.QtCore import QEvent, QObject, QTimer
+from PyQt5.QtWidgets import QApplication
+marks = {}
+
+
+class Probe(QObject):
+    def eventFilter(self, watched, event):
+        if event.type() == QEvent.Paint and 'paint' not in marks:
+            marks['paint'] = time.perf_counter()
+        return False
+
+
+app = QApplication([])
+probe = Probe()
+app.installEventFilter(probe)
+window = COVID19Stats.ApplicationWindow()
+shown = time.perf_counter()
+
+
+def Poll():
+    if window.Tables is not None and 'paint' in marks:
+        marks['tables'] = time.perf_counter()
+        app.quit()
+
+
+timer = QTimer()
+timer.timeout.connect(Poll)
+timer.start(5)
+app.exec_()
+print(json.dumps({'import_s': imported - start, 'window_s': shown - start, 'first_paint_s': marks['paint'] - start,
+                  'tables_s': marks['tables'] - start}), flush=True)
+os._exit(0)
+"""
+
+
+def BenchmarkStartup(runs=5, directory='.'):
+    """Cold starts the app runs times, returns the median import, window, first paint & tables loaded times"""
+    environment = dict(os.environ)
+    environment.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    samples = []
+    for run in range(runs):
+        output = subprocess.run([sys.executable, '-c', STARTUP_PROBE], cwd=directory, env=environment,
+                                capture_output=True, text=True, check=True, timeout=300).stdout
+        samples.append(json.loads(output.strip().splitlines()[-1]))
+    return {name: float(np.median([sample[name] for sample in samples])) for name in samples[0]}
+
+
+def Synthetic(store, scale):
+    """The store scaled by about scale: round(sqrt(scale)) copies of every location (their countries numbered) &
+    the rest of the factor in dates, repeating the daily increments so the series stay cumulative"""
+    from SeriesStore import SeriesStore
+
+    copies = max(1, int(round(math.sqrt(scale))))
+    days = max(1, int(round(len(store.Dates) * scale / copies)))
+    first = store.Axis.Days[0]
+    dates = [f'{day}T00:00:00Z' for day in np.arange(first, first + days)]
+    locations = {name: np.tile(values, copies) for name, values in store.Locations.items()}
+    suffixes = np.repeat([''] + [f' #{copy}' for copy in range(2, copies + 1)], len(store))
+    locations['country'] = np.char.add(locations['country'], suffixes)
+    locations['id'] = np.arange(len(store) * copies)
+    series = {}
+    for metric, values in store.Series.items():
+        daily = np.clip(np.diff(values, axis=1, prepend=0), 0, None)
+        daily = np.tile(daily, (copies, -(-days // values.shape[1])))[:, :days]
+        series[metric] = np.cumsum(daily, axis=1)
+    return SeriesStore(dates, locations, series)
+
+
+def Number(value):
+    value = value.item() if hasattr(value, 'item') else value
+    return None if isinstance(value, float) and math.isnan(value) else value
+
+
+def WriteFeeds(store, locations_path, recovered_path):
+    """Writes store as the tracker's /v2/locations & the recovered feed's JSON, one record at a time"""
+    table = store.Locations
+    dates = list(store.Dates)
+    with open(locations_path, 'w') as outfile:
+        outfile.write('{"locations": [')
+        for row in range(len(store)):
+            timelines = {metric: {'latest': int(store.Series[metric][row, -1]),
+                                  'timeline': dict(zip(dates, store.Series[metric][row].tolist()))}
+                         for metric in ('confirmed', 'deaths')}
+            timelines['recovered'] = {'latest': 0, 'timeline': {}}
+            record = {'id': int(table['id'][row]), 'country': str(table['country'][row]),
+                      'country_code': str(table['country_code'][row]),
+                      'country_population': Number(table['country_population'][row]),
+                      'province': str(table['province'][row]), 'last_updated': str(table['last_updated'][row]),
+                      'coordinates': {'latitude': Number(table['latitude'][row]),
+                                      'longitude': Number(table['longitude'][row])},
+                      'latest': {metric: Number(table[f'latest_{metric}'][row])
+                                 for metric in ('confirmed', 'deaths', 'recovered')},
+                      'timelines': timelines}
+            outfile.write((',' if row else '') + json.dumps(record))
+        outfile.write(']}')
+    keys = store.Axis.RecoveredKeys
+    with open(recovered_path, 'w') as outfile:
+        outfile.write('{"locations": [')
+        rows = np.flatnonzero(table['has_recovered'])
+        for i, row in enumerate(rows):
+            record = {'country': str(table['country'][row]), 'province': str(table['province'][row]),
+                      'latest': int(store.Recovered[row, -1]),
+                      'history': dict(zip(keys, store.Recovered[row].tolist()))}
+            outfile.write((',' if i else '') + json.dumps(record))
+        outfile.write(']}')
+
+
+class FileResponse(object):
+    """Stands in for a streamed requests response reading a file"""
+
+    def __init__(self, path):
+        self.path = path
+
+    def iter_content(self, chunk_size):
+        with open(self.path, 'rb') as f:
+            yield from iter(lambda: f.read(chunk_size), b'')
+
+
+def PeakRSS():
+    """Peak resident set size of this process in MB, None where it can't be read
+
+    Linux' ru_maxrss survives exec, so a spawned process would report its parent's peak, VmHWM is its own.
+    """
+    try:
+        with open('/proc/self/status') as status:
+            for line in status:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 ** 2 if sys.platform == 'darwin' else peak / 1024
+
+
+def StageIngest(work):
+    """Streams both feeds into a store & merges them (UpdateData without the network)"""
+    from DataDownload import MergeRecovered, ParseLocations, ParseRecovered
+
+    locations, recovered = os.path.join(work, 'locations.json'), os.path.join(work, 'recovered.json')
+    start = time.perf_counter()
+    store = ParseLocations(FileResponse(locations))
+    MergeRecovered(store, ParseRecovered(FileResponse(recovered)))
+    return time.perf_counter() - start, os.path.getsize(locations) + os.path.getsize(recovered)
+
+
+def StageDaily(work):
+    from DataDownload import GenerateDailyData
+    from SeriesStore import SeriesStore
+
+    store = SeriesStore.Load(os.path.join(work, 'data.npz'))
+    start = time.perf_counter()
+    data = GenerateDailyData(store)
+    return time.perf_counter() - start, sum(values.nbytes for values in data.Series.values())
+
+
+def StageAggregate(work):
+    """Timeline, accumulated & indicator tables"""
+    from SeriesStore import SeriesStore
+    from Tables import BuildTables
+
+    store = SeriesStore.Load(os.path.join(work, 'data.npz'))
+    start = time.perf_counter()
+    tables = BuildTables(store)
+    seconds = time.perf_counter() - start
+    return seconds, int(tables.timeline.memory_usage().sum() + tables.accumulated.memory_usage().sum())
+
+
+def StageSnapshot(work):
+    """Loading the tables at launch"""
+    from SeriesStore import SeriesStore
+    from Tables import LoadSnapshot
+
+    start = time.perf_counter()
+    store = SeriesStore.Load(os.path.join(work, 'data.npz'))
+    LoadSnapshot(store, os.path.join(work, 'tables.npz'))
+    return time.perf_counter() - start, os.path.getsize(os.path.join(work, 'tables.npz'))
+
+
+def LoadWorkTables(work):
+    from SeriesStore import SeriesStore
+    from Tables import LoadSnapshot
+
+    return LoadSnapshot(SeriesStore.Load(os.path.join(work, 'data.npz')), os.path.join(work, 'tables.npz'))
+
+
+def StageChart(work, chart):
+    """One chart's page & decimated payload"""
+    from Charts import PAYLOADS, WritePage, WritePayload
+    from Decimation import DETAIL, Decimate
+
+    tables = LoadWorkTables(work)
+    payload = f'{chart}.json'
+    start = time.perf_counter()
+    source, columns, _ = PAYLOADS[payload]
+    WritePayload(Decimate(getattr(tables, source), DETAIL[chart]), os.path.join(work, payload), columns)
+    WritePage(f'{chart}.html', work)
+    seconds = time.perf_counter() - start
+    return seconds, sum(os.path.getsize(os.path.join(work, name)) for name in (payload, f'{chart}.html'))
+
+
+def StageExport(work, plot, frames=5):
+    """Mean cost of one video frame of plot: decimating, building the figure & rendering it when a renderer
+    (kaleido) is available, else only the first two"""
+    from Aggregation import TableIndex
+    from Export import Frames, PLOTS, RenderFrame
+
+    tables = LoadWorkTables(work)
+    index = TableIndex(getattr(tables, PLOTS[plot].index[:-len('Index')].lower()))
+    times = tables.axis.Keys
+    frames = int(frames)
+    rendered = []
+    start = time.perf_counter()
+    for frame in Frames(plot, index, times[-frames:]):
+        try:
+            rendered.append(len(RenderFrame(plot, frame)))
+        except (ValueError, RuntimeError, ImportError):
+            PLOTS[plot].figure(frame)
+    seconds = (time.perf_counter() - start) / frames
+    return seconds, int(np.mean(rendered)) if rendered else 0
+
+
+def StageRaster(work, plot, frames=5):
+    """Mean cost of one natively drawn video frame of plot, tween frames included"""
+    from Aggregation import TableIndex
+    from Export import Frames, PLOTS
+    from Raster import RasterFrames
+
+    tables = LoadWorkTables(work)
+    index = TableIndex(getattr(tables, PLOTS[plot].index[:-len('Index')].lower()))
+    drawn = 0
+    start = time.perf_counter()
+    for images in RasterFrames(plot, Frames(plot, index, tables.axis.Keys[-int(frames):])):
+        drawn += len(images)
+    return (time.perf_counter() - start) / drawn, sum(image.nbytes for image in images)
+
+
+STAGES = {'ingest': StageIngest, 'daily': StageDaily, 'aggregate': StageAggregate, 'snapshot': StageSnapshot,
+          'chart': StageChart, 'export': StageExport, 'raster': StageRaster}
+
+
+def RunStage(stage, work):
+    """Runs one stage in this (fresh) process, returning its wall time, peak RSS & output size"""
+    name, *args = stage.split(':')
+    try:
+        seconds, output = STAGES[name](work, *args)
+    except Exception:
+        return {'error': traceback.format_exc().strip().splitlines()[-1]}
+    return {'seconds': seconds, 'peak_rss_mb': PeakRSS(), 'output_bytes': output}
+
+
+def Prepare(scale, work, source='data.json'):
+    """Writes the dataset of a scale into work: the store, its feeds as JSON & its tables snapshot"""
+    from SeriesStore import SeriesStore
+    from Tables import BuildTables, SaveSnapshot
+
+    store = SeriesStore.FromJSON(source)
+    if scale != 1:
+        store = Synthetic(store, scale)
+    store.Save(os.path.join(work, 'data.npz'))
+    WriteFeeds(store, os.path.join(work, 'locations.json'), os.path.join(work, 'recovered.json'))
+    SaveSnapshot(BuildTables(store), os.path.join(work, 'tables.npz'))
+    return {'locations': len(store), 'dates': len(store.Dates)}
+
+
+def Regressions(results, baseline, tolerance=0.25):
+    """Stages slower, bigger in memory or output than baseline by more than tolerance (& a small noise floor)"""
+    floors = {'seconds': 0.05, 'peak_rss_mb': 16, 'output_bytes': 1024}
+    found = []
+    for scale, stages in results['scales'].items():
+        for stage, now in stages['stages'].items():
+            before = baseline.get('scales', {}).get(scale, {}).get('stages', {}).get(stage)
+            if before is None or 'error' in now or 'error' in before:
+                continue
+            for measure, floor in floors.items():
+                if now.get(measure) is None or before.get(measure) is None:
+                    continue
+                if now[measure] > before[measure] * (1 + tolerance) and now[measure] - before[measure] > floor:
+                    found.append(f"{scale} {stage}: {measure} {before[measure]:.3f} -> {now[measure]:.3f}")
+    return found
+
+
+def BenchmarkPipeline(scales=(1, 10, 100), source='data.json', frames=5):
+    """Times every stage from ingest to export on the checked-in data & on synthetic datasets scaled up from it
+
+    Each stage runs in a fresh process, so its peak RSS is its own.
+    """
+    from Charts import PAYLOADS
+    from Export import PLOTS
+    from Raster import RASTER_PLOTS
+
+    stages = ['ingest', 'daily', 'aggregate', 'snapshot'] + [f'chart:{chart}' for _, _, chart in PAYLOADS.values()]
+    stages += [f'export:{plot}' for plot in PLOTS] + [f'raster:{plot}' for plot in RASTER_PLOTS]
+    results = {'created': time.strftime('%Y-%m-%dT%H:%M:%S'), 'python': sys.version.split()[0],
+               'platform': sys.platform, 'cpus': os.cpu_count(), 'scales': {}}
+    context = multiprocessing.get_context('spawn')
+    for scale in scales:
+        with tempfile.TemporaryDirectory() as work:
+            dataset = Prepare(scale, work, source)
+            measured = {}
+            for stage in stages:
+                run = f'{stage}:{frames}' if stage.startswith(('export:', 'raster:')) else stage
+                with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                    measured[stage] = pool.submit(RunStage, run, work).result()
+            results['scales'][f'x{scale}'] = {'dataset': dataset, 'stages': measured}
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="COVID19 Stats Visualizer benchmarks")
+    commands = parser.add_subparsers(dest='command', required=True)
+    server = commands.add_parser('server', help="load test the artifact server")
+    server.add_argument('--clients', type=int, default=8)
+    server.add_argument('--requests', type=int, default=400)
+    api = commands.add_parser('api', help="load test the /api/series queries")
+    api.add_argument('--clients', type=int, default=8)
+    api.add_argument('--requests', type=int, default=2000)
+    startup = commands.add_parser('startup', help="time the cold start of the app up to its first paint")
+    startup.add_argument('--runs', type=int, default=5)
+    pipeline = commands.add_parser('pipeline', help="time ingest, aggregation, chart & export stages headless")
+    pipeline.add_argument('--scales', type=int, nargs='+', default=[1, 10, 100])
+    pipeline.add_argument('--frames', type=int, default=5, help="frames timed per video export")
+    pipeline.add_argument('--out', default='benchmark.json')
+    pipeline.add_argument('--baseline', default='benchmark_baseline.json')
+    pipeline.add_argument('--tolerance', type=float, default=0.25)
+    pipeline.add_argument('--save-baseline', action='store_true', help="store the results as the new baseline")
+    args = parser.parse_args()
+    if args.command == 'server':
+        print(json.dumps(BenchmarkServer(args.clients, args.requests), indent=2))
+    elif args.command == 'api':
+        print(json.dumps(BenchmarkAPI(args.clients, args.requests), indent=2))
+    elif args.command == 'startup':
+        print(json.dumps(BenchmarkStartup(args.runs), indent=2))
+    elif args.command == 'pipeline':
+        results = BenchmarkPipeline(args.scales, frames=args.frames)
+        with open(args.out, 'w') as outfile:
+            json.dump(results, outfile, indent=2)
+        print(json.dumps(results['scales'], indent=2))
+        if args.save_baseline:
+            with open(args.baseline, 'w') as outfile:
+                json.dump(results, outfile, indent=2)
+        elif os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                regressions = Regressions(results, json.load(f), args.tolerance)
+            for regression in regressions:
+                print("REGRESSION " + regression)
+            if regressions:
+                sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
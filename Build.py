@@ -0,0 +1,296 @@
+"""Headless build of the chart pages, their payloads & the videos, without Qt
+
+    python Build.py charts [--out DIR] [--jobs N] [--update] [--force] [--only Bubble Map ...]
+    python Build.py video Map [Bubble ...] [--out DIR | --to FILE] [--jobs N] [--update] [--renderer plotly]
+    python Build.py all [--out DIR] [--jobs N] [--update] [--renderer plotly]
+    python Build.py serve [--out DIR] [--port 8000] [--reload 60]
+
+The series & tables snapshot are read from (& updated in) the working directory, the charts are published as a
+new version under --out/builds (see Publish) unless --in-place writes them into --out directly, videos are
+written into --out. The GUI drives the same Engine. Every command takes --profile FILE to dump cProfile stats of the
+run (or, with --update, of the update only). serve serves the published charts & the /api queries of the tables
+(see Query), picking up a newer tables snapshot every --reload seconds.
+"""
+import argparse
+import logging
+import os
+import shutil
+import sys
+import threading
+import time
+from contextlib import nullcontext
+
+from Artifacts import ArtifactManifest
+from Instrument import Profile, Span
+from Publish import Builds
+
+# Files the pages load besides their own page & payload, copied into output directories other than the working one
+STATIC = ['charts.js', 'plotly.min.js', 'qwebchannel.js']
+
+
+def ReportFeeds(results, progress):
+    """Reports the feeds that failed to download, returns whether they all succeeded"""
+    failed = [feed for feed in results if feed.status == 'failed']
+    for feed in failed:
+        progress(f"Downloading {feed.name} Failed: {feed.error}", 30)
+    return not failed
+
+
+class Engine(object):
+    """Builds every artifact of the app from the saved series
+
+    directory: where the artifacts are written, workers: processes building payloads & rendering frames (all
+    cores by default), versioned: publish every chart build as a new version under directory/builds keeping the
+    keep latest ones (else charts are written into directory in place, tracked by manifest, an ArtifactManifest
+    inside directory by default),
+    cache: FrameCache of frames rendered by plotly, renderer: 'raster' draws the videos Raster supports natively,
+    'plotly' renders every frame through plotly for fidelity exports (& is used for the map either way).
+    progress(message, type=20) callbacks receive the status messages (type is a logging level), cancelled()
+    callbacks stop long running steps early.
+    """
+
+    def __init__(self, directory='.', workers=None, manifest=None, cache=None, renderer='raster', versioned=True,
+                 keep=3):
+        self.directory = directory
+        self.renderer = renderer
+        self.workers = workers
+        os.makedirs(directory, exist_ok=True)
+        self.builds = Builds(directory, keep) if versioned else None
+        self.manifest = manifest if manifest is not None else ArtifactManifest(
+            os.path.join(directory, 'artifacts.json'))
+        self.cache = cache
+
+    def Load(self, progress=None):
+        """The tables of the saved series, from their snapshot when it is current"""
+        from Tables import LoadTables
+
+        with Span('load'):
+            return LoadTables(progress=progress)
+
+    def Update(self, tables=None, progress=None):
+        """Downloads the feeds & returns the updated tables"""
+        from Tables import UpdateTables
+
+        progress = progress or (lambda message, type=20: None)
+        with Span('update'):
+            results, tables = UpdateTables(tables, progress)
+        ReportFeeds(results, progress)
+        return tables
+
+    @staticmethod
+    def Indexes(tables):
+        """The (timeline, accumulated) TableIndexes the videos are exported from"""
+        from Aggregation import TableIndex
+
+        return TableIndex(tables.timeline), TableIndex(tables.accumulated)
+
+    @staticmethod
+    def Queries(tables):
+        """The Query.SeriesQuery answering the server's /api from tables"""
+        from Query import SeriesQuery
+
+        return SeriesQuery(tables)
+
+    @staticmethod
+    def CopyStatic(directory):
+        """Copies the scripts the pages load (& their compressed variants) into directory"""
+        from Artifacts import ENCODINGS, TempFile, Variant
+
+        if os.path.abspath(directory) == os.path.abspath('.'):
+            return
+        for filename in STATIC:
+            for source in [filename] + [Variant(filename, encoding) for encoding in ENCODINGS]:
+                target = os.path.join(directory, source)
+                if os.path.exists(source) and (not os.path.exists(target) or
+                                               os.path.getmtime(target) < os.path.getmtime(source)):
+                    shutil.copy2(source, TempFile(target))
+                    os.replace(TempFile(target), target)
+
+    def Charts(self, tables, progress=None, charts=None, force=False):
+        """Writes the chart pages & the payloads whose data changed (of the listed charts, or all, every one when
+        forced), payloads are built concurrently. When versioned they are built into a new version, published if
+        anything changed. Returns the Scheduler.TaskResult of every payload."""
+        from Server import CHARTS, LIBRARIES
+
+        progress = progress or (lambda message, type=20: None)
+        with Span('charts') as span:
+            if self.builds is None:
+                results, changed = self.BuildCharts(self.directory, self.manifest, tables, progress, charts, force)
+            else:
+                version = self.builds.Prepare(CHARTS + LIBRARIES + ['artifacts.json'])
+                try:
+                    results, changed = self.BuildCharts(version, ArtifactManifest(
+                        os.path.join(version, 'artifacts.json')), tables, progress, charts, force)
+                except BaseException:
+                    self.builds.Discard(version)
+                    raise
+                if changed:
+                    progress(f"Published {os.path.basename(self.builds.Publish(version))}")
+                else:
+                    self.builds.Discard(version)
+            span.Count(**{status: sum(result.status == status for result in results)
+                          for status in ('done', 'skipped', 'failed')})
+        return results
+
+    def BuildCharts(self, directory, manifest, tables, progress, charts, force):
+        """Builds the charts into directory, returns their TaskResults & whether any file changed"""
+        import Charts
+        from Scheduler import BuildScheduler
+
+        self.CopyStatic(directory)
+        pages = Charts.WritePages(directory)
+        for page in pages:
+            progress(f"Wrote {page}")
+        tasks = Charts.PayloadTasks(tables, directory, charts)
+        if force:
+            for task in tasks:
+                manifest.hashes.pop(manifest.Key(task.artifact), None)
+        scheduler = BuildScheduler(self.workers, progress=progress, manifest=manifest)
+        results = scheduler.Run(tasks)
+        for result in results:
+            if result.status == 'failed':
+                progress(f"Generating {result.artifact} Failed:\n{result.error}", 30)
+        return results, bool(pages) or any(result.status == 'done' for result in results)
+
+    def VideoFile(self, plot):
+        from Export import PLOTS
+
+        return os.path.join(self.directory, PLOTS[plot].filename)
+
+    def Video(self, plot, filename, index, times, progress=None, cancelled=None):
+        """Exports the video of plot from its TableIndex (see Indexes) to filename, returns the frames written"""
+        with Span(f'video/{plot}') as span:
+            written = self.Export(plot, filename, index, times, progress, cancelled)
+            span.Count(frames=written)
+        return written
+
+    def Native(self, plot):
+        """Whether the video of plot is drawn by Raster (in the calling process) rather than rendered by plotly (in
+        worker processes)"""
+        from Raster import RASTER_PLOTS
+
+        return self.renderer == 'raster' and plot in RASTER_PLOTS
+
+    def Export(self, plot, filename, index, times, progress, cancelled):
+        from Export import ExportVideo, Frames, FrameTimes
+
+        progress = progress or (lambda message, type=20: None)
+        frames = len(FrameTimes(plot, times))
+        if self.Native(plot):
+            from Raster import ExportRaster
+
+            return ExportRaster(plot, Frames(plot, index, times), filename, cancelled=cancelled,
+                                progress=lambda i: progress(f"Drawing Frame {i}/{frames}"))
+        return ExportVideo(plot, Frames(plot, index, times), filename, workers=self.workers, cache=self.cache,
+                           progress=lambda i: progress(f"Rendering Frame {i}/{frames}"), cancelled=cancelled)
+
+    def Videos(self, tables, plots, progress=None, cancelled=None, filename=None):
+        """Exports the videos of plots into the output directory (or the single one to filename)"""
+        from Export import PLOTS
+
+        timeline, accumulated = self.Indexes(tables)
+        indexes = {'TimelineIndex': timeline, 'AccumulatedIndex': accumulated}
+        written = {}
+        for plot in plots:
+            target = filename or self.VideoFile(plot)
+            written[target] = self.Video(plot, target, indexes[PLOTS[plot].index], tables.axis.Keys, progress,
+                                         cancelled)
+        return written
+
+
+def NativeVideo(plot, filename, index, times, progress=None, cancelled=None):
+    """Engine.Video of a natively drawn plot (see Engine.Native), a module function so a worker process can run it
+    (see Jobs.Job.RunProcess)"""
+    return Engine(versioned=False).Video(plot, filename, index, times, progress, cancelled)
+
+
+def main():
+    from Decimation import DETAIL
+    from FrameCache import FrameCache
+
+    parser = argparse.ArgumentParser(description="Builds the charts & videos without the GUI")
+    commands = parser.add_subparsers(dest='command', required=True)
+    charts = commands.add_parser('charts', help="write the chart pages & payloads")
+    charts.add_argument('--only', nargs='+', choices=list(DETAIL), help="build only these charts")
+    charts.add_argument('--force', action='store_true', help="rebuild payloads whose inputs did not change")
+    video = commands.add_parser('video', help="export chart videos")
+    video.add_argument('plots', nargs='+', choices=list(DETAIL))
+    video.add_argument('--to', help="output file, when exporting a single video")
+    commands.add_parser('all', help="write the charts & export every video")
+    serve = commands.add_parser('serve', help="serve the charts & the /api queries")
+    serve.add_argument('--out', default='.', help="directory the charts were built into")
+    serve.add_argument('--port', type=int, default=8000)
+    serve.add_argument('--reload', type=float, default=60, help="seconds between checks for a newer snapshot")
+    for command in (video, commands.choices['all']):
+        command.add_argument('--renderer', choices=['raster', 'plotly'], default='raster',
+                             help="plotly renders frames like the chart pages, slower (default: raster)")
+    for command in (charts, video, commands.choices['all']):
+        command.add_argument('--out', default='.', help="output directory")
+        command.add_argument('--jobs', type=int, help="worker processes (default: all cores)")
+        command.add_argument('--update', action='store_true', help="download the latest data first")
+        command.add_argument('--profile', help="write cProfile stats of the run (of the update with --update)")
+    for command in (charts, commands.choices['all']):
+        command.add_argument('--in-place', action='store_true', help="write the charts into --out, unversioned")
+        command.add_argument('--keep', type=int, default=3, help="published chart versions kept")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+    if args.command == 'video' and args.to and len(args.plots) > 1:
+        parser.error("--to takes a single plot")
+
+    def Progress(message, type=20):
+        logging.log(type, message)
+
+    if args.command == 'serve':
+        Serve(Engine(args.out), args.port, args.reload, Progress)
+        return
+    engine = Engine(args.out, args.jobs, cache=FrameCache(), renderer=getattr(args, 'renderer', 'raster'),
+                    versioned=not getattr(args, 'in_place', False), keep=getattr(args, 'keep', 3))
+    tables = engine.Load(Progress)
+    if args.update:
+        with Profile(args.profile) if args.profile else nullcontext():
+            tables = engine.Update(tables, Progress)
+    with Profile(args.profile) if args.profile and not args.update else nullcontext():
+        failed = RunCommand(engine, tables, args, Progress)
+    if args.profile:
+        Progress(f"Wrote Profile To {args.profile}")
+    sys.exit(1 if failed else 0)
+
+
+def Serve(engine, port, reload, progress, snapshot='tables.npz'):
+    """Serves engine's published charts & the /api queries of its tables, swapping in new tables (& so a fresh
+    response cache) whenever their snapshot changes"""
+    from Server import MakeServer
+
+    httpd = MakeServer(engine.directory, port)
+    httpd.queries = engine.Queries(engine.Load(progress))
+    threading.Thread(name='daemon_server', target=httpd.serve_forever, daemon=True).start()
+    progress(f"Serving {os.path.abspath(engine.directory)} On http://localhost:{httpd.server_address[1]}")
+    modified = os.path.getmtime(snapshot)
+    try:
+        while True:
+            time.sleep(reload)
+            if os.path.exists(snapshot) and os.path.getmtime(snapshot) != modified:
+                modified = os.path.getmtime(snapshot)
+                httpd.queries = engine.Queries(engine.Load(progress))
+                progress("Reloaded The Tables")
+    except KeyboardInterrupt:
+        httpd.shutdown()
+
+
+def RunCommand(engine, tables, args, progress):
+    """Builds what the charts/video/all command of args asks for, returns whether a chart failed"""
+    from Decimation import DETAIL
+
+    failed = False
+    if args.command in ('charts', 'all'):
+        results = engine.Charts(tables, progress, getattr(args, 'only', None), getattr(args, 'force', False))
+        failed = any(result.status == 'failed' for result in results)
+    if args.command in ('video', 'all'):
+        plots = args.plots if args.command == 'video' else list(DETAIL)
+        for target, frames in engine.Videos(tables, plots, progress, filename=getattr(args, 'to', None)).items():
+            progress(f"Wrote {frames} Frames To {target}")
+    return failed
+
+
+if __name__ == "__main__":
+    main()
@@ -1,38 +1,28 @@
+import functools
+import json
 import logging
 import logging.handlers
 import os
-import shutil
 import sys
 import threading
 import time
-from datetime import datetime
-from http.server import HTTPServer, CGIHTTPRequestHandler
-from os import chdir, environ
-
-import cv2
-import pandas as pd
-import plotly
-import plotly.express as px
-import plotly.graph_objects as go
-import pytz
+from os import environ
+
 import qtmodern.styles
 import qtmodern.windows
-import tzlocal
-from PyQt5.QtCore import QUrl, QTimer, pyqtSlot
+from PyQt5.QtCore import QThreadPool, QUrl, QTimer, pyqtSlot
 from PyQt5.QtWebChannel import QWebChannel
 from PyQt5.QtWidgets import QMainWindow, QApplication, QFileDialog
-from bubbly.bubbly import bubbleplot
-import matplotlib.pyplot as plt
 
-from DataDownload import GetLatest, UpdateData, GenerateDailyData, GetDailyData, GetSummary, GetData
+from Build import Engine, NativeVideo, ReportFeeds
+from FrameCache import FrameCache
+from Instrument import RunProfiled, Span
+from Jobs import Job
+from Server import MakeServer
 from UI import Ui_MainWindow
 
-
-def StartServer(path, port=8000):
-    """Start a simple webserver serving path on port"""
-    chdir(path)
-    httpd = HTTPServer(('', port), CGIHTTPRequestHandler)
-    httpd.serve_forever()
+# pandas, plotly, cv2 & the modules built on them are imported on first use (mostly on job threads), so the
+# window is shown without waiting for them
 
 
 def SetupLogging():
@@ -45,12 +35,6 @@ def SetupLogging():
     root.addHandler(handler)
 
 
-def SafeDivide(x, y):
-    if y == 0:
-        return 0
-    return (x / y)*100
-
-
 class ApplicationWindow(Ui_MainWindow, QMainWindow):
 
     def __init__(self):
@@ -59,12 +43,20 @@ class ApplicationWindow(Ui_MainWindow, QMainWindow):
         self.setupUi(self)
         self.AddToLog("Starting Server Thread")
         self.port = 8000
+        self.httpd = MakeServer('.', self.port, background=True)
         self.server = threading.Thread(name='daemon_server',
-                                       target=StartServer,
-                                       args=('.', self.port))
+                                       target=self.httpd.serve_forever)
         self.server.setDaemon(True)  # Set as a daemon so it will be killed once the main thread is dead.
         self.server.start()
+        # Jobs mostly wait on the network or worker processes, so they get threads of their own whatever the
+        # number of cores (the summary refresh must never hold up loading or an update)
+        self.Jobs = QThreadPool()
+        self.Jobs.setMaxThreadCount(4)
+        self.Job = None
+        self.ExportJob = None
+        self.SummaryJob = None
         self.Update.clicked.connect(self.UpdateHandler)
+        self.Cancel.clicked.connect(self.CancelHandler)
         self.Bubble.setChecked(True)
         self.Bubble.toggled.connect(lambda: self.SetCurrentPlot("Bubble"))
         self.Map.toggled.connect(lambda: self.SetCurrentPlot("Map"))
@@ -75,26 +67,48 @@ class ApplicationWindow(Ui_MainWindow, QMainWindow):
         self.SummaryTimer = QTimer()
         self.SummaryTimer.setInterval(600000)
         self.SummaryTimer.timeout.connect(self.UpdateSummary)
-        self.UpdateSummary()
+        self.SummaryTimer.start()
         self.LatestCountries = []
         self.data = []
         self.Times = []
         self.TimesFormatted = []
+        self.TimesLabels = []
         self.Timeline = []
         self.Summary = []
         self.Accumulated = []
-        self.AccumulatedData = GetData()
-        self.browser.setUrl(QUrl("http://localhost:8000/bubble.html"))
-        self.data = GetDailyData()
-        self.GenerateTimes()
-        self.GenerateTimeline()
-        self.GenerateAccumulated()
+        self.Tables = None
+        self.TimelineIndex = None
+        self.AccumulatedIndex = None
+        self.Engine = Engine(cache=FrameCache())
+        self.browser.setUrl(QUrl(f"http://localhost:{self.port}/Bubble.html"))
         self.show()
+        if os.path.exists('Summary.json'):
+            with open('Summary.json') as f:
+                self.ShowSummary(json.load(f))
+        self.UpdateSummary()
+        self.AddToLog("Loading Data")
+        self.StartJob(self.LoadAll, self.LoadFinished)
+
+    def LoadAll(self, job):
+        """Load job: builds the tables of the saved series"""
+        tables = self.Engine.Load(job.Progress)
+        return tables, self.Engine.Indexes(tables), self.Engine.Queries(tables)
+
+    @pyqtSlot(object)
+    def LoadFinished(self, result):
+        self.SetTables(*result)
+        self.JobEnded(self.Job)
+        self.AddToLog("Data Loaded", duration=2000)
 
     @pyqtSlot(str)
     def ShowCountryPlot(self, country):
+        import plotly.graph_objects as go
+
+        if self.TimelineIndex is None:
+            self.AddToLog("Data Is Still Loading", duration=3000)
+            return
         self.AddToLog(f"Showing Plots For {country}", duration=5000)
-        CountryData = self.Timeline[self.Timeline.country == country]
+        CountryData = self.TimelineIndex.Country(country)
         fig = go.Figure()
         fig.add_trace(go.Scatter(x=CountryData['Date'], y=CountryData['deaths'],
                                  mode='lines+markers',
@@ -107,130 +121,42 @@ class ApplicationWindow(Ui_MainWindow, QMainWindow):
 
         fig.show()
 
-    def GenerateLatest(self):
-        """Generates Array of Latest COVID19 Statistics For All Countries"""
-        latesttemp = []
-        for country in self.data:
-            if len(latesttemp) > 0 and latesttemp[-1][0] == country['country']:
-                latesttemp[-1][1] += country['latest']['confirmed']
-                latesttemp[-1][2] += country['latest']['deaths']
-                latesttemp[-1][3] += country['latest']['recovered']
-                continue
-            temp = [country['country'], country['latest']['confirmed'], country['latest']['deaths'],
-                    country['latest']['recovered']]
-            latesttemp.append(temp)
-        self.LatestCountries = pd.DataFrame(data=latesttemp, columns=['country', 'confirmed', 'deaths', 'recovered'])
-
-    def GenerateBubbleGraph(self):
-        """Generates Bubble Graph From Latest Data COVID19 Data"""
-        figure = bubbleplot(dataset=self.Timeline, x_column='deaths', y_column='recovered',
-                            bubble_column='country', time_column="date", size_column='confirmed', scale_bubble=4,
-                            x_title="Number of Deaths", color_column="confirmed", y_title="Recoveries",
-                            colorbar_title='New Cases', x_logscale=True, y_logscale=True,
-                            colorscale='Viridis', title='COVID19')
-
-        plotly.offline.plot(figure, filename='Bubble.html', include_plotlyjs='directory', auto_open=False)
-
-    def GenerateDeathBubble(self):
-        """Generates Death Rate Bubble Graph From Latest COVID19 Data"""
-        figure = bubbleplot(dataset=self.Accumulated, x_column='recovered', y_column='confirmed',
-                            bubble_column='country', time_column="date", size_column='DeathRate', scale_bubble=4,
-                            x_title="Number of Recoveries", color_column="DeathRate",
-                            y_title="Number of Confirmed Cases",
-                            colorbar_title='Death Rate', x_logscale=True, y_logscale=True,
-                            colorscale='Viridis', title='Country Death Rate')
-
-        plotly.offline.plot(figure, filename='EBubble.html', include_plotlyjs='directory', auto_open=False)
-
-    def GenerateMap(self):
-        fig = px.choropleth(self.Timeline,  # Input Pandas DataFrame
-                            locations="country",  # DataFrame column with locations
-                            color="confirmed",  # DataFrame column with color values
-                            hover_name="country",
-                            hover_data=["confirmed", "deaths", "recovered"],
-                            animation_frame="Date",
-                            animation_group="country",
-                            projection="miller",
-                            locationmode='country names')
-        plotly.offline.plot(fig, filename='Map.html', include_plotlyjs='directory', auto_open=False)
-
-    def GenerateTimes(self):
-        """Generates array containing all dates included in the dataset"""
-        for item in self.data[0]["timelines"]["confirmed"]["timeline"]:
-            datetime_object = datetime.strptime(item, '%Y-%m-%dT%H:%M:%S%z').replace(tzinfo=pytz.utc).astimezone(
-                tzlocal.get_localzone())
-            time = datetime_object.strftime("%y%m%d")
-            self.Times.append(time)
-            self.TimesFormatted.append(item)
-
-    def GenerateTimeline(self):
-        """Generates All Countries Timeline Data"""
-        timelinetemp = []
-        for time, timekey in zip(self.Times, self.TimesFormatted):
-            rtime = datetime.strptime(timekey, '%Y-%m-%dT%H:%M:%S%z').replace(tzinfo=pytz.utc).astimezone(
-                tzlocal.get_localzone())
-            currentday = rtime.strftime("%d-%B-%y")
-            rtime = rtime.strftime("%#m/%#d/%y")
-            for country in self.data:
-                if len(country['timelines']['recovered']['timeline']) == 0:
-                    continue
-                if len(timelinetemp) > 0 and timelinetemp[-1][0] == country['country']:
-                    timelinetemp[-1][1] += country['timelines']['confirmed']['timeline'][timekey]
-                    timelinetemp[-1][2] += country['timelines']['deaths']['timeline'][timekey]
-                    timelinetemp[-1][3] += country['timelines']['recovered']['timeline'][rtime]
-                else:
-                    temp = [country['country'], country['timelines']['confirmed']['timeline'][timekey],
-                            country['timelines']['deaths']['timeline'][timekey],
-                            country['timelines']['recovered']['timeline'][rtime], int(time), currentday]
-                    timelinetemp.append(temp)
-        self.Timeline = pd.DataFrame(data=timelinetemp, columns=['country', 'confirmed', 'deaths',
-                                                                 'recovered', 'date', 'Date'])
-
-    def GenerateAccumulated(self):
-        """Generates All Countries Accumulated Timeline"""
-        timelinetemp = []
-        for time, timekey in zip(self.Times, self.TimesFormatted):
-            rtime = datetime.strptime(timekey, '%Y-%m-%dT%H:%M:%S%z').replace(tzinfo=pytz.utc).astimezone(
-                tzlocal.get_localzone())
-            currentday = rtime.strftime("%d-%B-%y")
-            rtime = rtime.strftime("%#m/%#d/%y")
-            for country in self.AccumulatedData:
-                if len(country['timelines']['recovered']['timeline']) == 0:
-                    continue
-                if len(timelinetemp) > 0 and timelinetemp[-1][0] == country['country']:
-                    timelinetemp[-1][1] += country['timelines']['confirmed']['timeline'][timekey]
-                    timelinetemp[-1][2] += country['timelines']['deaths']['timeline'][timekey]
-                    timelinetemp[-1][3] += country['timelines']['recovered']['timeline'][rtime]
-                    timelinetemp[-1][4] = SafeDivide(timelinetemp[-1][2], timelinetemp[-1][1])
-                else:
-                    temp = [country['country'], country['timelines']['confirmed']['timeline'][timekey],
-                            country['timelines']['deaths']['timeline'][timekey],
-                            country['timelines']['recovered']['timeline'][rtime],
-                            SafeDivide(country['timelines']['deaths']['timeline'][timekey],
-                            country['timelines']['confirmed']['timeline'][timekey]), currentday, int(time)]
-                    timelinetemp.append(temp)
-        self.Accumulated = pd.DataFrame(data=timelinetemp, columns=['country', 'confirmed', 'deaths',
-                                                                    'recovered', 'DeathRate', 'Date', 'date'])
-
-    def GenerateBarCases(self):
-        CleanedCases = self.Timeline[self.Timeline.confirmed != 0]
-        fig = px.bar(CleanedCases, x='country', y='confirmed', animation_frame="Date", animation_group="country",
-                     hover_data=["confirmed", "deaths", "recovered"],
-                     color_continuous_scale=plotly.express.colors.cyclical.IceFire)
-        fig.update_layout(xaxis_tickangle=-45, xaxis={'categoryorder': 'total descending'})
-        plotly.offline.plot(fig, filename='BarCases.html', include_plotlyjs='directory', auto_open=False)
-
-    def GenerateBarDeaths(self):
-        CleanedDeaths = self.Timeline[self.Timeline.deaths != 0]
-        fig = px.bar(CleanedDeaths, x='country', y='deaths', animation_frame="Date", animation_group="country",
-                     hover_data=["confirmed", "deaths", "recovered"],
-                     color_continuous_scale=plotly.express.colors.cyclical.IceFire)
-        fig.update_layout(xaxis_tickangle=-45, xaxis={'categoryorder': 'total descending'})
-        plotly.offline.plot(fig, filename='BarDeaths.html', include_plotlyjs='directory', auto_open=False)
-
-    def UpdateSummary(self):
+    def SetTables(self, tables, indexes, queries):
+        """Makes tables (see Tables.BuildTables), their (timeline, accumulated) TableIndexes & SeriesQuery the
+        ones shown, exported & queried through the server's /api, only called on the GUI thread"""
+        self.Tables = tables
+        self.httpd.queries = queries
+        self.AccumulatedData = tables.store
+        self.data = tables.data
+        self.TimesFormatted = list(tables.axis.Raw)
+        self.Times = tables.axis.Keys
+        self.TimesLabels = tables.axis.Labels
+        self.Timeline = tables.timeline
+        self.Accumulated = tables.accumulated
+        self.LatestCountries = tables.latest
+        self.TimelineIndex, self.AccumulatedIndex = indexes
+
+    def UpdateSummary(self, fetch=True):
+        if self.SummaryJob is not None:
+            return
         self.AddToLog("Updating Summary", duration=5000)
-        self.Summary = GetSummary()
+        self.SummaryJob = Job(self.FetchSummary, fetch)
+        self.SummaryJob.signals.finished.connect(self.SummaryFetched)
+        self.SummaryJob.signals.failed.connect(self.SummaryFailed)
+        self.Jobs.start(self.SummaryJob)
+
+    def FetchSummary(self, job, fetch):
+        from DataDownload import GetSummary
+
+        return GetSummary(fetch)
+
+    @pyqtSlot(object)
+    def SummaryFetched(self, summary):
+        self.SummaryJob = None
+        self.ShowSummary(summary)
+
+    def ShowSummary(self, summary):
+        self.Summary = summary
         self.Cases.setStyleSheet("QLabel { color : yellow; }")
         self.Cases.setText(f"{self.Summary['Global']['TotalConfirmed']:,}")
         self.CasesNew.setText(f"(+{self.Summary['Global']['NewConfirmed']:,})")
@@ -241,39 +167,99 @@ class ApplicationWindow(Ui_MainWindow, QMainWindow):
         self.Recovered.setText(f"{self.Summary['Global']['TotalRecovered']:,} ")
         self.RecoveredNew.setText(f"(+{self.Summary['Global']['NewRecovered']:,})")
 
-    def UpdateHandler(self):
-        self.UpdateThread = threading.Thread(target=self.UpdateAll)
-        self.UpdateThread.start()
+    @pyqtSlot(str)
+    def SummaryFailed(self, error):
+        self.SummaryJob = None
+        self.AddToLog("Updating Summary Failed, See Log", type=30)
+
+    def StartJob(self, function, finished, *args, export=False):
+        """Runs function(job, *args) on the thread pool
+
+        Loads & updates run one at a time, as do exports, but an export may run alongside an update: the update
+        builds new tables & publishes its charts as a new version (see Publish), the export keeps the tables it
+        started from & writes its video to a temporary file first.
+        """
+        job = Job(function, *args)
+        if export:
+            self.ExportJob = job
+        else:
+            self.Job = job
+        self.SetButtons()
+        job.signals.progress.connect(self.JobProgress)
+        job.signals.finished.connect(finished)
+        job.signals.failed.connect(lambda error: self.JobFailed(job))
+        job.signals.cancelled.connect(lambda: self.JobCancelled(job))
+        self.Jobs.start(job)
+
+    def JobEnded(self, job):
+        if job is self.Job:
+            self.Job = None
+        if job is self.ExportJob:
+            self.ExportJob = None
+        self.SetButtons()
+
+    def SetButtons(self):
+        self.Update.setDisabled(self.Job is not None)
+        self.Export.setDisabled(self.ExportJob is not None or self.Tables is None)
+        self.Cancel.setDisabled(not self.CancellableJobs())
+
+    def CancellableJobs(self):
+        """The running update & export, the load is left out: nothing would start it again once cancelled"""
+        return [job for job in (self.Job, self.ExportJob) if job is not None and job.function != self.LoadAll]
+
+    @pyqtSlot(str, int)
+    def JobProgress(self, message, type):
+        self.AddToLog(message, type=type)
+
+    def JobFailed(self, job):
+        self.JobEnded(job)
+        self.AddToLog("Job Failed, See Log", type=30)
+
+    def JobCancelled(self, job):
+        self.JobEnded(job)
+        self.AddToLog("Job Canceled", duration=5000)
+
+    def CancelHandler(self):
+        """Cancels the running update & export"""
+        for job in self.CancellableJobs():
+            self.AddToLog("Canceling")
+            self.Cancel.setDisabled(True)
+            job.Cancel()
 
-    def UpdateAll(self):
-        self.Export.setDisabled(True)
-        self.Update.setDisabled(True)
+    def UpdateHandler(self):
         self.AddToLog("Database Update Started")
-        self.AddToLog("Downloading Data")
-        UpdateData()
-        self.AddToLog("Parsing Data")
-        GenerateDailyData()
-        self.UpdateSummary()
-        self.AddToLog("Getting Data")
-        self.data = GetDailyData()
-        self.AddToLog("Generating Times")
-        self.GenerateTimes()
-        self.GenerateLatest()
-        self.AddToLog("Generating Timeline")
-        self.GenerateTimeline()
-        self.AddToLog("Generating Accumulated Data Timeline")
-        self.GenerateAccumulated()
-        self.AddToLog("Generating Bubble Graph")
-        self.GenerateBubbleGraph()
-        self.AddToLog("Generating Cases Bar Chart")
-        self.GenerateBarCases()
-        self.AddToLog("Generating Deaths Bar Chart")
-        self.GenerateBarDeaths()
-        self.AddToLog("Generating Death Rate Bubble Graph")
-        self.GenerateDeathBubble()
-        self.AddToLog("Update Completed Successfully", duration=2000)
-        self.Export.setDisabled(False)
-        self.Update.setDisabled(False)
+        self.StartJob(self.UpdateAll, self.UpdateFinished, self.Tables)
+
+    def UpdateAll(self, job, tables):
+        """Update job: downloading & aggregating run in a worker process, the charts in the engine's scheduler
+
+        With PROFILE_UPDATE set to a file, the worker's cProfile stats are written to it.
+        """
+        from Tables import UpdateTables
+
+        update = UpdateTables
+        if environ.get("PROFILE_UPDATE"):
+            update = functools.partial(RunProfiled, environ["PROFILE_UPDATE"], UpdateTables)
+        with Span('update'):
+            results, tables = job.RunProcess(update, tables)
+            downloaded = ReportFeeds(results, job.Progress)
+            job.Check()
+            indexes = self.Engine.Indexes(tables)
+            queries = self.Engine.Queries(tables)
+            job.Check()
+            charts = self.Engine.Charts(tables, job.Progress)
+        return tables, indexes, queries, charts, downloaded
+
+    @pyqtSlot(object)
+    def UpdateFinished(self, result):
+        tables, indexes, queries, charts, downloaded = result
+        self.SetTables(tables, indexes, queries)
+        self.JobEnded(self.Job)
+        self.UpdateSummary(fetch=False)
+        if not downloaded or any(chart.status == 'failed' for chart in charts):
+            self.AddToLog("Update Completed With Errors, See Log", type=30)
+        else:
+            self.AddToLog("Update Completed Successfully", duration=2000)
 
     def AddToLog(self, log, type=20, duration=100000):
         self.statusbar.clearMessage()
@@ -286,7 +272,7 @@ class ApplicationWindow(Ui_MainWindow, QMainWindow):
 
     def SetCurrentPlot(self, plot):
         self.AddToLog(f"Switched to {plot}", duration=3000)
-        self.browser.setUrl(QUrl(f"http://localhost:8000/{plot}.html"))
+        self.browser.setUrl(QUrl(f"http://localhost:{self.port}/{plot}.html"))
         if plot == "Map":
             self.channel = QWebChannel(self.browser.page())
             self.browser.page().setWebChannel(self.channel)
@@ -294,118 +280,35 @@ class ApplicationWindow(Ui_MainWindow, QMainWindow):
             self.AddToLog("Created Web Channel", duration=3000)
 
     def ExportHandler(self):
-        self.ExportThread = threading.Thread(target=self.VideoExport)
-        self.ExportThread.start()
+        from Export import PLOTS
 
-    def VideoExport(self):
-        self.AddToLog("Video Export Starting")
-        self.Export.setDisabled(True)
-        self.Update.setDisabled(True)
-        frames = len(self.Times)
-        ImgPaths = []
-        if self.Bubble.isChecked():
-            i = 1
-            dic = "Bubble"
-            shutil.rmtree(dic, ignore_errors=True)
-            os.mkdir(dic)
-            for date in self.Times:
-                frame = self.Timeline[self.Timeline.date == int(date)]
-                fig = px.scatter(frame, x='deaths', y='recovered', color="confirmed", size_max=100,
-                                 size='confirmed', text='country', color_continuous_scale=px.colors.sequential.Viridis,
-                                 title='COVID19')
-                fig.write_image(f"{dic}/{i:03d}.jpeg")
-                self.AddToLog(f"Rendering Frame {i}/{frames}")
-                ImgPaths.append(f"Bubble/{i:03d}.jpeg")
-                i += 1
-        elif self.Map.isChecked():
-            i = 1
-            dic = "Map"
-            shutil.rmtree(dic, ignore_errors=True)
-            os.mkdir(dic)
-            for date in self.Times:
-                frame = self.Timeline[self.Timeline.date == int(date)]
-                fig = px.choropleth(frame,  # Input Pandas DataFrame
-                                    locations="country",  # DataFrame column with locations
-                                    color="confirmed",  # DataFrame column with color values
-                                    hover_name="country",
-                                    hover_data=["confirmed", "deaths", "recovered"],
-                                    projection="miller",
-                                    locationmode='country names')
-                fig.write_image(f"{dic}/{i:03d}.jpeg")
-                self.AddToLog(f"Rendering Frame {i}/{frames}")
-                ImgPaths.append(f"{dic}/{i:03d}.jpeg")
-                i += 1
-        elif self.BarCases.isChecked():
-            i = 1
-            dic = "BarCases"
-            shutil.rmtree(dic, ignore_errors=True)
-            os.mkdir(dic)
-            for date in self.Times:
-                CleanedCases = self.Timeline[self.Timeline.confirmed != 0]
-                frame = CleanedCases[CleanedCases.date == int(date)]
-                fig = px.bar(frame, x='country', y='confirmed',
-                             hover_data=["confirmed", "deaths", "recovered"],
-                             color_continuous_scale=plotly.express.colors.cyclical.IceFire)
-                fig.update_layout(xaxis_tickangle=-45, xaxis={'categoryorder': 'total descending'})
-                fig.write_image(f"{dic}/{i:03d}.jpeg")
-                self.AddToLog(f"Rendering Frame {i}/{frames}")
-                ImgPaths.append(f"{dic}/{i:03d}.jpeg")
-                i += 1
-        elif self.BarDeaths.isChecked():
-            i = 1
-            dic = "BarDeaths"
-            shutil.rmtree(dic, ignore_errors=True)
-            os.mkdir(dic)
-            for date in self.Times:
-                CleanedCases = self.Timeline[self.Timeline.deaths != 0]
-                frame = CleanedCases[CleanedCases.date == int(date)]
-                fig = px.bar(frame, x='country', y='deaths',
-                             hover_data=["confirmed", "deaths", "recovered"],
-                             color_continuous_scale=plotly.express.colors.cyclical.IceFire)
-                fig.update_layout(xaxis_tickangle=-45, xaxis={'categoryorder': 'total descending'})
-                fig.write_image(f"{dic}/{i:03d}.jpeg")
-                self.AddToLog(f"Rendering Frame {i}/{frames}")
-                ImgPaths.append(f"{dic}/{i:03d}.jpeg")
-                i += 1
-        elif self.EBubble.isChecked():
-            i = 1
-            dic = "DRBubble"
-            shutil.rmtree(dic, ignore_errors=True)
-            os.mkdir(dic)
-            for date in self.Times:
-                frame = self.Accumulated[self.Accumulated.date == int(date)]
-                fig = px.scatter(frame, x='recovered', y='confirmed', color="DeathRate", size_max=100,
-                                 size='DeathRate', text='country', color_continuous_scale=px.colors.sequential.Viridis,
-                                 title='COVID19 Death Rate')
-                fig.write_image(f"{dic}/{i:03d}.jpeg")
-                self.AddToLog(f"Rendering Frame {i}/{frames}")
-                ImgPaths.append(f"{dic}/{i:03d}.jpeg")
-                i += 1
-        self.AddToLog(f"Rendering Complete")
-        Frames = []
-        for im in ImgPaths:
-            img = cv2.imread(im)
-            height, width, layers = img.shape
-            size = (width, height)
-
-            # inserting the frames into an image array
-            Frames.append(img)
+        plot = self.CurrentPlot()
         options = QFileDialog.Options()
-        fileName, _ = QFileDialog.getSaveFileName(self, "Save", f"{dic}.avi", "Video Files (*.avi)", options=options)
-        if fileName:
-            out = cv2.VideoWriter(fileName, cv2.VideoWriter_fourcc(*'DIVX'), 4, size)
-            self.AddToLog("Writing File")
-            for f in Frames:
-                # writing to a image array
-                out.write(f)
-            out.release()
-            self.AddToLog("Video Exporting Complete", duration=5000)
-        else:
+        fileName, _ = QFileDialog.getSaveFileName(self, "Save", PLOTS[plot].filename, "Video Files (*.avi)",
+                                                  options=options)
+        if not fileName:
             self.AddToLog("Video Exporting Canceled", duration=5000)
-        shutil.rmtree(dic, ignore_errors=True)
-        self.Export.setDisabled(False)
-        self.Update.setDisabled(False)
-
+            return
+        self.AddToLog("Video Export Starting")
+        self.StartJob(self.VideoExport, self.ExportFinished, plot, fileName,
+                      getattr(self, PLOTS[plot].index), self.Times, export=True)
+
+    def CurrentPlot(self):
+        for plot in ("Bubble", "Map", "BarCases", "BarDeaths", "EBubble"):
+            if getattr(self, plot).isChecked():
+                return plot
+
+    def VideoExport(self, job, plot, fileName, index, times):
+        """Export job: natively drawn videos are drawn & encoded in a worker process, plotly frames are rendered in
+        the engine's worker processes & encoded on the job thread"""
+        if self.Engine.Native(plot):
+            return job.RunProcess(NativeVideo, plot, fileName, index, times, cooperative=True)
+        return self.Engine.Video(plot, fileName, index, times, job.Progress, job.Cancelled)
+
+    @pyqtSlot(object)
+    def ExportFinished(self, written):
+        self.JobEnded(self.ExportJob)
+        self.AddToLog("Video Exporting Complete", duration=5000)
 
 
 # Back up the reference to the exceptionhook
@@ -0,0 +1,122 @@
+import json
+import os
+
+from Artifacts import Precompress, WriteAtomic
+from Decimation import DETAIL, Decimate
+from Indicators import INDICATORS
+from Scheduler import BuildTask
+
+WEB_CHANNEL = """<script src="qwebchannel.js"></script>
+        <script>
+                    var backend;
+                    new QWebChannel(qt.webChannelTransport, function (channel) {
+                        backend = channel.objects.backend;
+                        window.backend = backend;
+                    });
+        </script>"""
+
+PAGE = """<html>
+<head><meta charset="utf-8" /></head>
+<body>
+    <div>
+        {head}
+        <script src="plotly.min.js"></script>
+        <script src="charts.js"></script>
+        <div id="chart" class="plotly-graph-div" style="height:100%; width:100%;"></div>
+        <script>COVIDChart('chart', {config});</script>
+    </div>
+</body>
+</html>
+"""
+
+TIMELINE_COLUMNS = ['confirmed', 'deaths', 'recovered'] + INDICATORS
+ACCUMULATED_COLUMNS = ['confirmed', 'deaths', 'recovered', 'DeathRate'] + INDICATORS
+
+# Data payloads: file name -> (source table in Tables, columns, chart whose level of detail (see Decimation) applies)
+PAYLOADS = {
+    'Bubble.json': ('timeline', TIMELINE_COLUMNS, 'Bubble'),
+    'Map.json': ('timeline', TIMELINE_COLUMNS, 'Map'),
+    'BarCases.json': ('timeline', TIMELINE_COLUMNS, 'BarCases'),
+    'BarDeaths.json': ('timeline', TIMELINE_COLUMNS, 'BarDeaths'),
+    'EBubble.json': ('accumulated', ACCUMULATED_COLUMNS, 'EBubble'),
+}
+
+# Chart pages: file name -> client side chart config (see charts.js). The config fields listed in 'switch' can be
+# switched between the payload columns in 'metrics' from a menu on the page.
+PAGES = {
+    'Bubble.html': {'type': 'bubble', 'data': 'Bubble.json', 'x': 'deaths', 'y': 'recovered', 'size': 'confirmed',
+                    'color': 'confirmed', 'scale': 4, 'x_title': 'Number of Deaths', 'y_title': 'Recoveries',
+                    'colorbar_title': 'New Cases', 'title': 'COVID19', 'switch': ['size', 'color'],
+                    'metrics': ['confirmed'] + INDICATORS},
+    'Map.html': {'type': 'map', 'data': 'Map.json', 'color': 'confirmed', 'click': True, 'switch': ['color'],
+                 'metrics': ['confirmed', 'deaths', 'recovered'] + INDICATORS},
+    'BarCases.html': {'type': 'bar', 'data': 'BarCases.json', 'y': 'confirmed', 'switch': ['y'],
+                      'metrics': ['confirmed', 'cases_per_100k', 'incidence_7d', 'doubling_time']},
+    'BarDeaths.html': {'type': 'bar', 'data': 'BarDeaths.json', 'y': 'deaths', 'switch': ['y'],
+                       'metrics': ['deaths', 'deaths_per_100k', 'cfr_lagged']},
+    'EBubble.html': {'type': 'bubble', 'data': 'EBubble.json', 'x': 'recovered', 'y': 'confirmed',
+                     'size': 'DeathRate', 'color': 'DeathRate', 'scale': 4, 'x_title': 'Number of Recoveries',
+                     'y_title': 'Number of Confirmed Cases', 'colorbar_title': 'Death Rate',
+                     'title': 'Country Death Rate', 'switch': ['size', 'color'],
+                     'metrics': ['DeathRate', 'cfr_lagged', 'deaths_per_100k', 'cases_per_100k']},
+}
+
+
+def WritePage(filename, directory='.'):
+    """Writes the thin page of a chart unless it is already up to date, returns whether it was written"""
+    config = PAGES[filename]
+    content = PAGE.format(head=WEB_CHANNEL if config.get('click') else '', config=json.dumps(config))
+    path = os.path.join(directory, filename)
+    if os.path.exists(path):
+        with open(path) as f:
+            if f.read() == content:
+                return False
+    WriteAtomic(path, content)
+    Precompress(path)
+    return True
+
+
+def WritePages(directory='.'):
+    return [filename for filename in PAGES if WritePage(filename, directory)]
+
+
+def WritePayload(table, filename, columns):
+    """Writes the columnar chart payload of an aggregated table
+
+    Every column is stored once as a dense dates x countries list (date major), the pages slice their frames
+    out of it client side.
+    """
+    import pandas as pd  # Charts is imported by the server at startup, pandas only needed here
+
+    countries = pd.unique(table['country'])
+    dates = table.drop_duplicates('date')
+    payload = {'countries': list(countries), 'keys': dates['date'].astype(int).tolist(),
+               'dates': dates['Date'].tolist(), 'columns': {}}
+    for column in columns:
+        grid = table.pivot(index='date', columns='country', values=column)
+        values = grid.reindex(index=dates['date'], columns=countries).fillna(0).to_numpy().ravel()
+        if table[column].dtype.kind == 'f':
+            payload['columns'][column] = values.round(2).tolist()
+        else:
+            payload['columns'][column] = values.astype(int).tolist()
+    WriteAtomic(filename, json.dumps(payload, separators=(',', ':')))
+    return [filename]
+
+
+def GeneratePayload(table, filename, detail, directory='.'):
+    """Generates the data of one chart from its aggregated table, decimated to the chart's level of detail"""
+    return WritePayload(Decimate(table, detail), os.path.normpath(os.path.join(directory, filename)),
+                        PAYLOADS[filename][1])
+
+
+def PayloadTasks(tables, directory='.', charts=None):
+    """Build tasks of the chart payloads of tables (see Tables.Tables) written into directory, of every chart
+    unless charts lists some"""
+    tasks = []
+    for filename, (source, columns, chart) in PAYLOADS.items():
+        if charts is not None and chart not in charts:
+            continue
+        tasks.append(BuildTask(os.path.normpath(os.path.join(directory, filename)), f"{chart} Data",
+                               GeneratePayload, (getattr(tables, source), filename, DETAIL[chart]),
+                               {'directory': directory}))
+    return tasks
@@ -1,111 +1,203 @@
 import json
-
-import requests
-from COVID19Py import COVID19
-import itertools
-
-
-def request(url, endpoint, params=None):
-    if params is None:
-        params = {}
-    response = requests.get(url + endpoint, {**params})
-    response.raise_for_status()
-    return response.json()
-
-
-def UpdateData():
+import logging
+import os
+from collections import namedtuple
+
+import numpy as np
+
+from Artifacts import WriteAtomic
+from Fetch import Feed, FeedFetcher
+from JSONStream import IterArray
+from Merge import MergeFeed
+from SeriesStore import SeriesBuilder, SeriesStore, LoadStore
+
+
+TRACKER_URL = "https://coronavirus-tracker-api.herokuapp.com"
+HEROKU_URL = "https://covid19api.herokuapp.com/"
+SUMMARY_URL = "https://api.covid19api.com/"
+CHUNK_SIZE = 64 * 1024
+
+# keys: the distinct date key lists of the records' histories, every record's 'keys' is the position of its own
+RecoveredFeed = namedtuple('RecoveredFeed', ['keys', 'records'])
+
+
+def ParseLocations(response):
+    """Streams the location timelines straight into a SeriesStore, one record at a time"""
+    builder = SeriesBuilder()
+    for location in IterArray(response.iter_content(CHUNK_SIZE), 'locations'):
+        builder.Add(location)
+    return builder.Build()
+
+
+def ParseRecovered(response):
+    """Streams the recovered feed, keeping every record's history as an array over its own date keys
+
+    Records normally share one set of keys, so each distinct set is kept once.
+    """
+    keys = {}
+    records = []
+    for record in IterArray(response.iter_content(CHUNK_SIZE), 'locations'):
+        history = record.pop('history') or {}
+        record['keys'] = keys.setdefault(tuple(history), len(keys))
+        record['history'] = np.fromiter(history.values(), dtype=np.int64, count=len(history))
+        records.append(record)
+    return RecoveredFeed(list(keys), records)
+
+
+def Feeds(tracker=TRACKER_URL, heroku=HEROKU_URL, summary=SUMMARY_URL):
+    """The upstream feeds: location timelines, recovered timelines, latest totals & the per country summary"""
+    return {'locations': Feed('locations', tracker + "/v2/locations", {"source": "jhu", "timelines": "true"},
+                              ParseLocations),
+            'recovered': Feed('recovered', heroku + "recovered", None, ParseRecovered),
+            'latest': Feed('latest', heroku + "latest", None),
+            'summary': Feed('summary', summary + "summary", None)}
+
+
+def LogFeedResult(result):
+    message = (f" Feed {result.name}: {result.status} (HTTP {result.http_status}, {result.attempts} attempts, "
+               f"{result.elapsed:.2f}s)")
+    if result.status == 'failed':
+        logging.warning(f"{message}: {result.error}")
+    else:
+        logging.info(message)
+
+
+def SaveFeed(fetcher, result, filename):
+    """Writes a fetched feed to its fallback file"""
+    if result.status != 'fetched':
+        return
+    WriteAtomic(filename, json.dumps(result.payload))
+    fetcher.Accept(result.name)
+
+
+def MergeRecovered(store, recovered):
+    """Writes the recovered feed into the store's recovered series, matching records by (country, province)"""
+    columns = [store.Axis.Positions(keys) for keys in recovered.keys]
+    rows = [{'country': country, 'province': province, 'row': row}
+            for row, (country, province) in enumerate(zip(store.Locations['country'].tolist(),
+                                                          store.Locations['province'].tolist()))]
+
+    def Apply(location, record):
+        row = location['row']
+        history = record['history']
+        store.Locations['latest_recovered'][row] = record['latest'] or 0
+        store.Locations['has_recovered'][row] = len(history) > 0
+        if len(history) > 0:
+            positions = columns[record['keys']]
+            store.Recovered[row] = np.where(positions >= 0, history[positions], 0)
+
+    return MergeFeed(rows, recovered.records, Apply)
+
+
+def LogMergeReport(feed, report):
+    logging.info(f" Merged {report.matched} {feed} records")
+    if report.unmatched_feed:
+        logging.warning(f" {len(report.unmatched_feed)} {feed} records have no location: {report.unmatched_feed}")
+    if report.unmatched_locations:
+        logging.warning(f" {len(report.unmatched_locations)} locations have no {feed} record: "
+                        f"{report.unmatched_locations}")
+    if report.duplicates:
+        logging.warning(f" {len(report.duplicates)} duplicate {feed} records ignored: {report.duplicates}")
+
+
+def UpdateData(incremental=True, tracker=TRACKER_URL, heroku=HEROKU_URL, summary=SUMMARY_URL, fetcher=None):
+    """Fetches all feeds concurrently, merges in the recovered feed & saves the timelines in data.npz
+
+    The location & recovered feeds are parsed while they stream in, so no full response body or JSON tree is
+    ever held in memory. Unchanged feeds are skipped through conditional requests. In incremental mode only the
+    dates past the last stored one are appended to the saved series & the file is left untouched when no new
+    date arrived.
+    Returns {feed name: FeedResult}.
+    """
+    fetcher = fetcher or FeedFetcher()
+    feeds = Feeds(tracker, heroku, summary)
+    results = fetcher.Fetch(feeds.values())
+    for result in results.values():
+        LogFeedResult(result)
+    SaveFeed(fetcher, results['latest'], 'Latest.json')
+    SaveFeed(fetcher, results['summary'], 'Summary.json')
+    statuses = {results[name].status for name in ('locations', 'recovered')}
+    if statuses == {'not-modified'}:
+        logging.info(" Locations & recovered feeds unchanged")
+        return results
+    if 'not-modified' in statuses:
+        stale = [feeds[name] for name in ('locations', 'recovered') if results[name].status == 'not-modified']
+        results.update(fetcher.Fetch(stale, conditional=False))
+    if any(results[name].status == 'failed' for name in ('locations', 'recovered')):
+        logging.warning(" Didn't Update")
+        return results
+    fetched = results['locations'].payload
     try:
-        covid19 = COVID19()
-        locations = covid19.getLocations(timelines=True)
-        recovered = request("https://covid19api.herokuapp.com/", "recovered")
-        for country in recovered['locations']:
-            if country['province'] == 'nan':
-                country['province'] = ''
-            for location in locations:
-                if country['country'] == location['country'] and country['province'] == location['province']:
-                    location['latest']['recovered'] = country["latest"]
-                    location['timelines']['recovered']["latest"] = country["latest"]
-                    location['timelines']['recovered']["timeline"] = country["history"]
-                    # for fromr, tor in zip(country["history"].items(),
-                    #                       location['timelines']['recovered']["timeline"].items()):
-                    #     location['timelines']['recovered']["timeline"][tor[0]] = country["history"][fromr[0]]
-                    break
-
-        with open('data.json', 'w') as outfile:
-            json.dump(locations, outfile)
-        outfile.close()
-        return True
-    except:
-        print("Didn't Update")
-        return False
+        LogMergeReport("recovered", MergeRecovered(fetched, results['recovered'].payload))
+    except (KeyError, TypeError, ValueError) as e:
+        logging.warning(f" Didn't Update, malformed feed: {e!r}")
+        return results
+    stored = SeriesStore.Load('data.npz') if incremental and os.path.exists('data.npz') else None
+    store = stored.Extend(fetched) if stored is not None else fetched
+    if store is stored:
+        logging.info(" No new dates since " + str(stored.Dates[-1]))
+    else:
+        if stored is not None and store is fetched:
+            logging.info(" Stored series can't be extended, replacing them")
+        elif stored is not None:
+            logging.info(f" Appending {len(store.Dates) - len(stored.Dates)} new dates")
+        store.Save('data.npz')
+    fetcher.Accept('locations', 'recovered')
+    return results
 
 
 def GetData():
-    with open('data.json') as f:
-        locations = json.load(f)
-    f.close()
-    return locations
-
-
-def GetLatest():
-    try:
-        latest = request("https://covid19api.herokuapp.com/", "latest")
-        with open('Latest.json', 'w') as outfile:
-            json.dump(latest, outfile)
-        outfile.close()
-    except:
-        with open('Latest.json') as f:
-            latest = json.load(f)
-        f.close()
-    return latest
-
-
-def GetSummary():
-    try:
-        Summary = request("https://api.covid19api.com/", "summary")
-        with open('Summary.json', 'w') as outfile:
-            json.dump(Summary, outfile)
-        outfile.close()
-    except:
-        with open('Summary.json') as f:
-            Summary = json.load(f)
-        f.close()
-    return Summary
-
-
-def GenerateDailyData():
-    with open('data.json') as f:
-        data = json.load(f)
-    f.close()
-    for i in range(len(data)):
-        previous = 0
-        for j in data[i]['timelines']['confirmed']['timeline']:
-            temp = previous
-            previous = data[i]['timelines']['confirmed']['timeline'][j]
-            data[i]['timelines']['confirmed']['timeline'][j] -= temp
-            if data[i]['timelines']['confirmed']['timeline'][j] < 0:
-                data[i]['timelines']['confirmed']['timeline'][j] = 0
-        previous = 0
-        for j in data[i]['timelines']['deaths']['timeline']:
-            temp = previous
-            previous = data[i]['timelines']['deaths']['timeline'][j]
-            data[i]['timelines']['deaths']['timeline'][j] -= temp
-            if data[i]['timelines']['deaths']['timeline'][j] < 0:
-                data[i]['timelines']['deaths']['timeline'][j] = 0
-        previous = 0
-        for j in data[i]['timelines']['recovered']['timeline']:
-            temp = previous
-            previous = data[i]['timelines']['recovered']['timeline'][j]
-            data[i]['timelines']['recovered']['timeline'][j] -= temp
-            if data[i]['timelines']['recovered']['timeline'][j] < 0:
-                data[i]['timelines']['recovered']['timeline'][j] = 0
-    with open('daily.json', 'w') as outfile:
-        json.dump(data, outfile)
-    outfile.close()
-
-
-def GetDailyData():
-    with open('daily.json') as f:
-        daily = json.load(f)
-    f.close()
-    return daily
+    return LoadStore('data.npz', 'data.json')
+
+
+def GetFeed(name, filename, fetch=True):
+    """Fetches one feed (unless fetch is False), falling back to its last saved copy"""
+    if fetch:
+        fetcher = FeedFetcher()
+        result = fetcher.Fetch([Feeds()[name]])[name]
+        LogFeedResult(result)
+        SaveFeed(fetcher, result, filename)
+        if result.status == 'fetched':
+            return result.payload
+    with open(filename) as f:
+        return json.load(f)
+
+
+def GetLatest(fetch=True):
+    return GetFeed('latest', 'Latest.json', fetch)
+
+
+def GetSummary(fetch=True):
+    return GetFeed('summary', 'Summary.json', fetch)
+
+
+def Rolling(values, window):
+    """Trailing mean over the last window dates along the date axis (shorter windows at the start)"""
+    summed = np.cumsum(values, axis=-1, dtype=np.float64)
+    summed[..., window:] = summed[..., window:] - summed[..., :-window]
+    counts = np.minimum(np.arange(1, values.shape[-1] + 1), window)
+    return summed / counts
+
+
+def GenerateDailyData(data=None, window=0, growth=False):
+    """Generates the daily new cases/deaths/recoveries of every location from the cumulative series
+
+    All metrics are differenced at once along the date axis & clamped at zero. With window the trailing
+    rolling average of each metric is added as `<metric>_avg`, with growth the daily growth rate in percent
+    of the previous day's total is added as `<metric>_growth`.
+    """
+    if data is None:
+        data = GetData()
+    metrics = list(data.Series)
+    cumulative = np.stack([data.Series[metric] for metric in metrics])
+    daily = np.diff(cumulative, axis=-1, prepend=0)
+    np.clip(daily, 0, None, out=daily)
+    series = dict(zip(metrics, daily))
+    if window:
+        series.update(zip([f'{metric}_avg' for metric in metrics], Rolling(daily, window)))
+    if growth:
+        previous = np.zeros(cumulative.shape, dtype=np.float64)
+        previous[..., 1:] = cumulative[..., :-1]
+        rate = np.divide(daily * 100, previous, out=np.zeros(previous.shape), where=previous > 0)
+        series.update(zip([f'{metric}_growth' for metric in metrics], rate))
+    return SeriesStore(data.Dates, data.Locations, series, data.Axis)
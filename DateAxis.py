@@ -0,0 +1,43 @@
+import calendar
+
+import numpy as np
+
+
+class DateAxis(object):
+    """A store's date axis, parsed once into every representation the feeds, tables & plots use
+
+    The feeds stamp each day with its UTC midnight (e.g. 2020-01-22T00:00:00Z), so the calendar date is taken
+    as is in UTC. Converting to local time would move every date onto the previous day west of Greenwich.
+
+    Raw: the feed's timestamps, Days: datetime64[D] dates, Keys: int %y%m%d keys (the tables' 'date' column),
+    Labels: %d-%B-%y labels (the tables' 'Date' column), RecoveredKeys: the recovered feed's m/d/yy keys.
+    """
+
+    def __init__(self, dates):
+        self.Raw = np.asarray(dates, dtype=str)
+        self.Days = np.array([date[:10] for date in self.Raw], dtype='datetime64[D]')
+        years = self.Days.astype('datetime64[Y]').astype(np.int64) + 1970
+        months = self.Days.astype('datetime64[M]').astype(np.int64) % 12 + 1
+        days = (self.Days - self.Days.astype('datetime64[M]')).astype(np.int64) + 1
+        self.Keys = (years % 100) * 10000 + months * 100 + days
+        self.Labels = [f'{day:02d}-{calendar.month_name[month]}-{year % 100:02d}'
+                       for year, month, day in zip(years.tolist(), months.tolist(), days.tolist())]
+        self.RecoveredKeys = [f'{month}/{day}/{year % 100:02d}'
+                              for year, month, day in zip(years.tolist(), months.tolist(), days.tolist())]
+
+    def __len__(self):
+        return len(self.Raw)
+
+    def Slice(self, start, stop=None):
+        axis = DateAxis.__new__(DateAxis)
+        axis.Raw = self.Raw[start:stop]
+        axis.Days = self.Days[start:stop]
+        axis.Keys = self.Keys[start:stop]
+        axis.Labels = self.Labels[start:stop]
+        axis.RecoveredKeys = self.RecoveredKeys[start:stop]
+        return axis
+
+    def Positions(self, keys):
+        """Position in keys of every recovered key of the axis, -1 where a date is missing from keys"""
+        positions = {key: i for i, key in enumerate(keys)}
+        return np.array([positions.get(key, -1) for key in self.RecoveredKeys], dtype=np.int64)
@@ -0,0 +1,79 @@
+from collections import namedtuple
+
+import numpy as np
+
+# top: countries kept per frame (the rest are summed into an OTHER row), None keeps all; rank: column the
+# countries are ranked by; frames: most frames shown, longer histories are thinned to keyframes every step dates
+# plus a daily tail of at least the recent latest dates (see FrameDates), None keeps every date
+LevelOfDetail = namedtuple('LevelOfDetail', ['top', 'rank', 'frames', 'step', 'recent'])
+
+OTHER = 'Other'
+COUNTS = ['confirmed', 'deaths', 'recovered']
+
+# Level of detail of every chart, shared by the chart payloads & the video export
+DETAIL = {
+    'Bubble': LevelOfDetail(30, 'confirmed', 120, 7, 7),
+    'Map': LevelOfDetail(None, 'confirmed', 120, 7, 7),
+    'BarCases': LevelOfDetail(25, 'confirmed', 120, 7, 7),
+    'BarDeaths': LevelOfDetail(25, 'deaths', 120, 7, 7),
+    'EBubble': LevelOfDetail(30, 'confirmed', 120, 7, 7),
+}
+
+
+def FrameDates(count, detail):
+    """Positions of the dates shown out of count dates
+
+    All of them if they fit in detail.frames, else keyframes every detail.step dates (counted from the first
+    date) followed by a daily tail of the latest dates, as long as the frame budget allows & at least
+    detail.recent dates. When even that doesn't fit the keyframes are spread to multiples of detail.step.
+    Anchoring the keyframes to the first date keeps them in place as dates are appended, so a daily update only
+    adds the new date's frame (see FrameCache).
+    """
+    positions = np.arange(count)
+    if detail.frames is None or count <= detail.frames:
+        return positions
+    stride = detail.step
+    while True:
+        for recent in range(detail.frames, min(detail.recent, detail.frames) - 1, -1):
+            older = positions[:count - recent]
+            keyframes = older[older % stride == 0]
+            if len(keyframes) + recent <= detail.frames:
+                return np.concatenate([keyframes, positions[count - recent:]])
+        stride += detail.step
+
+
+def TopN(table, top, rank):
+    """Keeps the top countries of every date of an aggregated table by rank, summing the rest into OTHER rows
+
+    The OTHER rows carry the summed counts & their death rate, per capita indicators don't apply to them & are
+    0. Rows stay date major with each date's OTHER row last.
+    """
+    import pandas as pd  # Charts (imported by the server at startup) imports this module
+    from Aggregation import DeathRate
+
+    if top is None or len(table) == 0:
+        return table
+    order = table.groupby('date', sort=False)[rank].rank(method='first', ascending=False).to_numpy()
+    keep = order <= top
+    if keep.all():
+        return table
+    rest = table[~keep]
+    other = rest.groupby('date', sort=False).agg({**{column: 'sum' for column in COUNTS}, 'Date': 'first'})
+    other = other.reset_index()
+    other['country'] = OTHER
+    if 'DeathRate' in table:
+        other['DeathRate'] = DeathRate(other['deaths'], other['confirmed'])
+    for column in table.columns:
+        if column not in other:
+            other[column] = 0
+    decimated = pd.concat([table[keep], other[table.columns]], ignore_index=True)
+    return decimated.sort_values('date', kind='stable', ignore_index=True)
+
+
+def Decimate(table, detail):
+    """Applies a level of detail to an aggregated table: drops the dates that aren't shown & buckets countries"""
+    dates = table['date'].unique()
+    shown = dates[FrameDates(len(dates), detail)]
+    if len(shown) < len(dates):
+        table = table[table['date'].isin(shown)]
+    return TopN(table, detail.top, detail.rank)
@@ -0,0 +1,147 @@
+import multiprocessing
+import os
+from collections import deque, namedtuple
+from concurrent.futures import Future, ProcessPoolExecutor
+
+import cv2
+import numpy as np
+import plotly.express as px
+
+from Artifacts import AtomicFile
+from Decimation import DETAIL, FrameDates, TopN
+from Instrument import Span
+
+PlotType = namedtuple('PlotType', ['index', 'nonzero', 'figure', 'filename'])
+
+RENDER_SETTINGS = {'format': 'jpeg'}
+
+
+def BubbleFigure(frame):
+    return px.scatter(frame, x='deaths', y='recovered', color="confirmed", size_max=100,
+                      size='confirmed', text='country', color_continuous_scale=px.colors.sequential.Viridis,
+                      title='COVID19')
+
+
+def MapFigure(frame):
+    return px.choropleth(frame,  # Input Pandas DataFrame
+                         locations="country",  # DataFrame column with locations
+                         color="confirmed",  # DataFrame column with color values
+                         hover_name="country",
+                         hover_data=["confirmed", "deaths", "recovered"],
+                         projection="miller",
+                         locationmode='country names')
+
+
+def BarFigure(frame, y):
+    fig = px.bar(frame, x='country', y=y,
+                 hover_data=["confirmed", "deaths", "recovered"],
+                 color_continuous_scale=px.colors.cyclical.IceFire)
+    fig.update_layout(xaxis_tickangle=-45, xaxis={'categoryorder': 'total descending'})
+    return fig
+
+
+def BarCasesFigure(frame):
+    return BarFigure(frame, 'confirmed')
+
+
+def BarDeathsFigure(frame):
+    return BarFigure(frame, 'deaths')
+
+
+def DeathBubbleFigure(frame):
+    return px.scatter(frame, x='recovered', y='confirmed', color="DeathRate", size_max=100,
+                      size='DeathRate', text='country', color_continuous_scale=px.colors.sequential.Viridis,
+                      title='COVID19 Death Rate')
+
+
+PLOTS = {
+    'Bubble': PlotType('TimelineIndex', None, BubbleFigure, 'Bubble.avi'),
+    'Map': PlotType('TimelineIndex', None, MapFigure, 'Map.avi'),
+    'BarCases': PlotType('TimelineIndex', 'confirmed', BarCasesFigure, 'BarCases.avi'),
+    'BarDeaths': PlotType('TimelineIndex', 'deaths', BarDeathsFigure, 'BarDeaths.avi'),
+    'EBubble': PlotType('AccumulatedIndex', None, DeathBubbleFigure, 'DRBubble.avi'),
+}
+
+
+def FrameTimes(plot, times):
+    """The dates shown in the frames of plot, thinned to its level of detail"""
+    return np.asarray(times)[FrameDates(len(times), DETAIL[plot])]
+
+
+def Frames(plot, index, times):
+    """Yields the rows of the indexed table shown in each frame of plot, decimated like the plot's chart page"""
+    detail = DETAIL[plot]
+    nonzero = PLOTS[plot].nonzero
+    for date in FrameTimes(plot, times):
+        frame = TopN(index.Date(date), detail.top, detail.rank)
+        yield frame if nonzero is None else frame[frame[nonzero].to_numpy() != 0]
+
+
+def RenderFrame(plot, frame, settings=RENDER_SETTINGS):
+    """Renders one frame of plot to image bytes (runs in a worker process)"""
+    return PLOTS[plot].figure(frame).to_image(**settings)
+
+
+def DecodeFrame(image):
+    return cv2.imdecode(np.frombuffer(image, dtype=np.uint8), cv2.IMREAD_COLOR)
+
+
+def ExportVideo(plot, frames, filename, workers=None, fps=4, progress=None, cache=None, settings=RENDER_SETTINGS,
+                cancelled=None):
+    """Renders frames of plot in parallel workers & streams them in order into a video file
+
+    At most twice the number of workers frames are rendered ahead of the encoder, so memory stays bounded
+    however long the animation is. Frames found in cache are not rendered again, newly rendered ones are added
+    to it. The video is written to a temporary file that replaces filename once complete, when cancelled() turns
+    true the export stops & the partial file is removed. Returns the number of frames written.
+    """
+    progress = progress or (lambda done: None)
+    cancelled = cancelled or (lambda: False)
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool, \
+            AtomicFile(filename) as target:
+
+        def Submit(frame):
+            key = cache.Key(plot, frame, settings) if cache is not None else None
+            image = cache.Get(key) if key is not None else None
+            if image is None:
+                return key, pool.submit(RenderFrame, plot, frame, settings)
+            future = Future()
+            future.set_result(image)
+            return None, future
+
+        ahead = 2 * workers
+        pending = deque()
+        frames = iter(frames)
+        out = None
+        written = 0
+        for frame in frames:
+            pending.append(Submit(frame))
+            if len(pending) >= ahead:
+                break
+        try:
+            while pending:
+                if cancelled():
+                    target.Discard()
+                    break
+                key, future = pending.popleft()
+                with Span('frame', frames=1, cached=int(key is None)):
+                    image = future.result()
+                    if key is not None:
+                        cache.Put(key, image)
+                    frame = next(frames, None)
+                    if frame is not None:
+                        pending.append(Submit(frame))
+                    image = DecodeFrame(image)
+                    if out is None:
+                        height, width, layers = image.shape
+                        out = cv2.VideoWriter(target.temp, cv2.VideoWriter_fourcc(*'DIVX'), fps, (width, height))
+                    out.write(image)
+                written += 1
+                progress(written)
+        finally:
+            for key, future in pending:
+                future.cancel()
+            if out is not None:
+                out.release()
+    return written
@@ -0,0 +1,133 @@
+"""Local stand-in for the upstream COVID19 APIs, serving the checked-in data truncated to a number of days
+
+Run it & point UpdateData at it to exercise (incremental) updates without a network:
+    python FakeUpstream.py --days 120 --port 8001
+    UpdateData(tracker="http://localhost:8001", heroku="http://localhost:8001/")
+"""
+import argparse
+import copy
+import hashlib
+import json
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse
+
+from DateAxis import DateAxis
+
+
+def Truncate(locations, days):
+    """Copy of the location list with every timeline cut to its first days dates"""
+    locations = copy.deepcopy(locations)
+    if days is None:
+        return locations
+    for location in locations:
+        dates = list(location['timelines']['confirmed']['timeline'])[:days]
+        rkeys = set(DateAxis(dates).RecoveredKeys)
+        for metric in ('confirmed', 'deaths'):
+            timeline = location['timelines'][metric]['timeline']
+            location['timelines'][metric]['timeline'] = {date: timeline[date] for date in dates}
+            location['timelines'][metric]['latest'] = timeline[dates[-1]] if dates else 0
+            location['latest'][metric] = location['timelines'][metric]['latest']
+        recovered = location['timelines']['recovered']['timeline']
+        location['timelines']['recovered']['timeline'] = {key: value for key, value in recovered.items()
+                                                          if key in rkeys}
+    return locations
+
+
+class FakeUpstream(object):
+    """Holds the payloads of every faked endpoint"""
+
+    def __init__(self, data='data.json', latest='latest.json', summary='Summary.json', days=None):
+        with open(data) as f:
+            self.locations = json.load(f)
+        with open(latest) as f:
+            self.latest = json.load(f)
+        with open(summary) as f:
+            self.summary = json.load(f)
+        self.requests = []
+        self.failures = {}
+        self.SetDays(days)
+
+    def SetDays(self, days):
+        """Changes how much history is served, e.g. to simulate a new day arriving"""
+        locations = Truncate(self.locations, days)
+        recovered = []
+        for location in locations:
+            timeline = location['timelines']['recovered']['timeline']
+            if len(timeline) == 0:
+                continue
+            recovered.append({'country': location['country'], 'province': location['province'] or 'nan',
+                              'latest': list(timeline.values())[-1], 'history': timeline})
+            for record in (location['timelines']['recovered'], location['latest']):
+                record['recovered'] = 0
+            location['timelines']['recovered'] = {'latest': 0, 'timeline': {}}
+        payloads = {
+            '/v2/sources': {'sources': ['jhu']},
+            '/v2/locations': {'locations': locations},
+            '/recovered': {'locations': recovered},
+            '/latest': self.latest,
+            '/summary': self.summary,
+        }
+        self.payloads = {path: json.dumps(payload).encode() for path, payload in payloads.items()}
+
+    def Fail(self, path, times, status=503):
+        """Makes the next times requests of path fail with status"""
+        self.failures[path] = (times, status)
+
+    def Handler(self):
+        upstream = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                path = urlparse(self.path).path
+                upstream.requests.append(path)
+                if path not in upstream.payloads:
+                    self.send_error(404)
+                    return
+                times, status = upstream.failures.get(path, (0, None))
+                if times > 0:
+                    upstream.failures[path] = (times - 1, status)
+                    self.send_error(status)
+                    return
+                body = upstream.payloads[path]
+                etag = f'"{hashlib.sha1(body).hexdigest()}"'
+                if self.headers.get('If-None-Match') == etag:
+                    self.send_response(304)
+                    self.send_header('ETag', etag)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header('ETag', etag)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def Serve(self, port=0, background=True):
+        """Serves the payloads (from a daemon thread when background), returns the server & its base url"""
+        httpd = ThreadingHTTPServer(('127.0.0.1', port), self.Handler())
+        if background:
+            threading.Thread(target=httpd.serve_forever, daemon=True).start()
+        return httpd, f"http://127.0.0.1:{httpd.server_address[1]}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--days', type=int, default=None, help="number of dates to serve (default: all)")
+    parser.add_argument('--port', type=int, default=8001)
+    args = parser.parse_args()
+    httpd, url = FakeUpstream(days=args.days).Serve(args.port, background=False)
+    print(f"Serving fake upstream on {url}")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+import asyncio
+import json
+import os
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from Artifacts import WriteAtomic
+
+# parse, when given, consumes the streamed response & returns the payload instead of response.json()
+Feed = namedtuple('Feed', ['name', 'url', 'params', 'parse'], defaults=[None])
+FeedResult = namedtuple('FeedResult', ['name', 'status', 'payload', 'http_status', 'attempts', 'elapsed', 'error'])
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+def ParseJSON(response):
+    return response.json()
+
+
+class FeedFetcher(object):
+    """Fetches upstream feeds concurrently over one pooled session
+
+    Every request has a (connect, read) timeout & is retried with exponential backoff on connection errors,
+    timeouts & 429/5xx responses. Validators (ETag/Last-Modified) of the last accepted response of every feed
+    are kept in validators_path & sent back, so unchanged feeds come back as 'not-modified' without a body.
+    Feeds with a parse function are streamed into it instead of being read whole.
+    Outcomes are FeedResults with status 'fetched', 'not-modified' or 'failed'; nothing is raised.
+    """
+
+    def __init__(self, validators_path='feeds.json', timeout=(3.05, 60), retries=3, backoff=0.5, workers=8):
+        self.validators_path = validators_path
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.workers = workers
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=workers, pool_maxsize=workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.pending = {}
+        self.validators = {}
+        if validators_path and os.path.exists(validators_path):
+            with open(validators_path) as f:
+                self.validators = json.load(f)
+
+    def Headers(self, feed, conditional):
+        validators = self.validators.get(feed.name, {}) if conditional else {}
+        headers = {'Accept-Encoding': 'gzip, deflate'}
+        if validators.get('etag'):
+            headers['If-None-Match'] = validators['etag']
+        if validators.get('last_modified'):
+            headers['If-Modified-Since'] = validators['last_modified']
+        return headers
+
+    async def FetchFeed(self, loop, pool, feed, conditional=True):
+        start = time.perf_counter()
+        error = None
+        status = None
+        for attempt in range(1, self.retries + 2):
+            try:
+                response = await loop.run_in_executor(pool, lambda: self.session.get(
+                    feed.url, params=feed.params, headers=self.Headers(feed, conditional), timeout=self.timeout,
+                    stream=feed.parse is not None))
+                with response:
+                    status = response.status_code
+                    if status == 304:
+                        return FeedResult(feed.name, 'not-modified', None, status, attempt,
+                                          time.perf_counter() - start, None)
+                    if status not in RETRY_STATUSES:
+                        response.raise_for_status()
+                        payload = await loop.run_in_executor(pool, feed.parse or ParseJSON, response)
+                        self.pending[feed.name] = {'etag': response.headers.get('ETag'),
+                                                   'last_modified': response.headers.get('Last-Modified')}
+                        return FeedResult(feed.name, 'fetched', payload, status, attempt,
+                                          time.perf_counter() - start, None)
+                error = f"HTTP {status}"
+            except (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError) as e:
+                error = repr(e)
+            except (requests.HTTPError, KeyError, TypeError, ValueError) as e:
+                return FeedResult(feed.name, 'failed', None, status, attempt, time.perf_counter() - start, repr(e))
+            if attempt <= self.retries:
+                await asyncio.sleep(self.backoff * 2 ** (attempt - 1))
+        return FeedResult(feed.name, 'failed', None, status, self.retries + 1, time.perf_counter() - start, error)
+
+    async def FetchAll(self, feeds, conditional=True):
+        loop = asyncio.get_running_loop()
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            results = await asyncio.gather(*[self.FetchFeed(loop, pool, feed, conditional) for feed in feeds])
+        return {result.name: result for result in results}
+
+    def Fetch(self, feeds, conditional=True):
+        """Fetches feeds concurrently, returns {feed name: FeedResult}"""
+        return asyncio.run(self.FetchAll(feeds, conditional))
+
+    def Accept(self, *names):
+        """Stores the validators of fetched feeds once their payloads were successfully used"""
+        for name in names:
+            if name in self.pending:
+                self.validators[name] = self.pending.pop(name)
+        if self.validators_path:
+            WriteAtomic(self.validators_path, json.dumps(self.validators))
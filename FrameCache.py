@@ -0,0 +1,57 @@
+import hashlib
+import json
+import os
+
+from Artifacts import InputHash, WriteAtomic
+
+
+class FrameCache(object):
+    """Content addressed on-disk cache of rendered video frames with size bounded LRU eviction
+
+    Frames are keyed by (plot type, hash of the frame's rows, render settings), so a frame is only rendered
+    again when the data it shows or the way it is rendered changed.
+    """
+
+    def __init__(self, path='.framecache', max_bytes=512 * 1024 ** 2):
+        self.path = path
+        self.max_bytes = max_bytes
+        os.makedirs(path, exist_ok=True)
+        self.size = sum(entry.stat().st_size for entry in os.scandir(path) if entry.is_file())
+
+    @staticmethod
+    def Key(plot, frame, settings):
+        digest = hashlib.sha1()
+        digest.update(plot.encode())
+        digest.update(InputHash(frame).encode())
+        digest.update(json.dumps(settings, sort_keys=True).encode())
+        return digest.hexdigest()
+
+    def File(self, key):
+        return os.path.join(self.path, f'{key}.frame')
+
+    def Get(self, key):
+        """Cached frame bytes or None, marking the entry as recently used"""
+        try:
+            with open(self.File(key), 'rb') as f:
+                image = f.read()
+        except FileNotFoundError:
+            return None
+        os.utime(self.File(key))
+        return image
+
+    def Put(self, key, image):
+        WriteAtomic(self.File(key), image)
+        self.size += len(image)
+        if self.size > self.max_bytes:
+            self.Evict()
+
+    def Evict(self):
+        """Deletes the least recently used frames until the cache fits in max_bytes"""
+        entries = sorted((entry for entry in os.scandir(self.path) if entry.name.endswith('.frame')),
+                         key=lambda entry: entry.stat().st_mtime)
+        self.size = sum(entry.stat().st_size for entry in entries)
+        for entry in entries:
+            if self.size <= self.max_bytes:
+                break
+            self.size -= entry.stat().st_size
+            os.remove(entry.path)
@@ -0,0 +1,68 @@
+import numpy as np
+
+# Normalised metrics added to the aggregated tables, see Indicators
+INDICATORS = ['cases_per_100k', 'deaths_per_100k', 'incidence_7d', 'doubling_time', 'cfr_lagged']
+
+
+def Population(store):
+    """Population of every country (provinces repeat their country's population, so the largest is taken)"""
+    import pandas as pd
+
+    locations = store.Locations
+    population = pd.Series(locations['country_population'].astype(np.float64), index=locations['country'])
+    return population.groupby(level=0, sort=False).max()
+
+
+def Ratio(numerator, denominator, scale=1.0):
+    return np.divide(numerator * scale, denominator, out=np.zeros(np.broadcast(numerator, denominator).shape),
+                     where=denominator > 0)
+
+
+def Lagged(values, lag):
+    """values shifted lag dates later along the first axis, the first lag dates are 0"""
+    lagged = np.zeros_like(values)
+    if lag < len(values):
+        lagged[lag:] = values[:len(values) - lag]
+    return lagged
+
+
+def Indicators(confirmed, deaths, population, window=7, lag=14):
+    """Per capita & growth metrics of cumulative (dates x countries) confirmed & deaths matrices
+
+    cases/deaths_per_100k: cumulative counts per 100k people, incidence_7d: new cases over the last window
+    dates per 100k people, doubling_time: days cumulative cases take to double at the growth rate of the last
+    window dates (0 when they don't grow), cfr_lagged: deaths in percent of the cases confirmed lag dates
+    earlier, as deaths trail the cases they come from.
+    """
+    confirmed = np.asarray(confirmed, dtype=np.float64)
+    deaths = np.asarray(deaths, dtype=np.float64)
+    population = np.asarray(population, dtype=np.float64)[np.newaxis, :]
+    earlier = Lagged(confirmed, window)
+    growth = Ratio(confirmed, earlier)
+    doubling = np.zeros(confirmed.shape)
+    np.divide(window * np.log(2), np.log(growth, out=np.zeros(growth.shape), where=growth > 0), out=doubling,
+              where=growth > 1)
+    return {
+        'cases_per_100k': Ratio(confirmed, population, 1e5),
+        'deaths_per_100k': Ratio(deaths, population, 1e5),
+        'incidence_7d': Ratio(np.clip(confirmed - earlier, 0, None), population, 1e5),
+        'doubling_time': doubling,
+        'cfr_lagged': Ratio(deaths, Lagged(confirmed, lag), 100),
+    }
+
+
+def AddIndicators(tables, accumulated, population, window=7, lag=14):
+    """Computes the indicators once from the accumulated table & adds them as columns to every table in tables
+
+    The tables must share the accumulated table's row order (date major, same countries per date), as the
+    tables of one store built by Aggregate do.
+    """
+    dates = accumulated['date'].nunique()
+    countries = len(accumulated) // dates if dates else 0
+    shape = (dates, countries)
+    names = accumulated['country'].to_numpy()[:countries]
+    values = Indicators(accumulated['confirmed'].to_numpy().reshape(shape),
+                        accumulated['deaths'].to_numpy().reshape(shape),
+                        population.reindex(names).fillna(0).to_numpy(), window, lag)
+    columns = {name: values[name].ravel() for name in INDICATORS}
+    return [table.assign(**columns) for table in tables]
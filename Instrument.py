@@ -0,0 +1,194 @@
+import cProfile
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from os import environ
+
+# Upper bounds (seconds) of the span duration histogram buckets
+BUCKETS = [0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, float('inf')]
+PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+
+def RSS():
+    """Current resident set size in MB, None where /proc isn't available"""
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * PAGE_SIZE / 1024 ** 2
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+class Histogram(object):
+    def __init__(self):
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self.buckets = [0] * len(BUCKETS)
+        self.rss_delta_mb = 0.0
+        self.counts = {}
+
+    def Add(self, record):
+        seconds = record['seconds']
+        self.count += 1
+        self.sum += seconds
+        self.max = max(self.max, seconds)
+        self.buckets[next(i for i, bound in enumerate(BUCKETS) if seconds <= bound)] += 1
+        self.rss_delta_mb += record.get('rss_delta_mb') or 0.0
+        for name, value in record.get('counts', {}).items():
+            self.counts[name] = self.counts.get(name, 0) + value
+
+    def Summary(self):
+        return {'count': self.count, 'sum': self.sum, 'max': self.max, 'mean': self.sum / self.count,
+                'buckets': dict(zip(map(str, BUCKETS), self.buckets)), 'rss_delta_mb': self.rss_delta_mb,
+                'counts': self.counts}
+
+
+class Metrics(object):
+    """Every finished span of this process: aggregated into a duration histogram per span name & appended to a
+    JSON lines file when a path is given
+
+    Spans a worker process collects (see Collect) are handed to its parent instead, which records them nested
+    under its own current span (see Ingest).
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self.lock = threading.Lock()
+        self.histograms = {}
+        self.collectors = []
+
+    def Add(self, record):
+        with self.lock:
+            self.histograms.setdefault(record['span'], Histogram()).Add(record)
+
+    def Record(self, record):
+        with self.lock:
+            if self.collectors:
+                for records in self.collectors:
+                    records.append(record)
+                return
+        self.Add(record)
+        with self.lock:
+            if self.path:
+                with open(self.path, 'a') as outfile:
+                    outfile.write(json.dumps(record) + '\n')
+
+    def Snapshot(self):
+        with self.lock:
+            return {name: histogram.Summary() for name, histogram in sorted(self.histograms.items())}
+
+    def Prometheus(self):
+        """The histograms in the Prometheus text exposition format"""
+        snapshot = self.Snapshot()
+        lines = ['# TYPE covid19_span_seconds histogram']
+        for name, summary in snapshot.items():
+            cumulative = 0
+            for bound, count in summary['buckets'].items():
+                cumulative += count
+                le = '+Inf' if bound == 'inf' else bound
+                lines.append(f'covid19_span_seconds_bucket{{span="{name}",le="{le}"}} {cumulative}')
+            lines.append(f'covid19_span_seconds_sum{{span="{name}"}} {summary["sum"]}')
+            lines.append(f'covid19_span_seconds_count{{span="{name}"}} {summary["count"]}')
+        lines.append('# TYPE covid19_span_rss_delta_mb gauge')
+        for name, summary in snapshot.items():
+            lines.append(f'covid19_span_rss_delta_mb{{span="{name}"}} {summary["rss_delta_mb"]}')
+        lines.append('# TYPE covid19_span_items counter')
+        for name, summary in snapshot.items():
+            for item, value in summary['counts'].items():
+                lines.append(f'covid19_span_items{{span="{name}",item="{item}"}} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+# Spans are only written out (one line each, unrotated) when METRICSFILE names a file, /metrics serves them either way
+METRICS = Metrics(environ.get("METRICSFILE"))
+_stack = threading.local()
+
+
+def Current():
+    """Name of the innermost open span of this thread, '' outside of any"""
+    stack = getattr(_stack, 'names', None)
+    return stack[-1] if stack else ''
+
+
+class Span(object):
+    """Times a (nested) stage: with Span('tables', rows=len(table)) as span: ... span.Count(frames=1)
+
+    Span names are joined with their enclosing spans' by '/', e.g. update/tables/timeline. The finished span is
+    recorded with its duration, RSS delta & counts into METRICS.
+    """
+
+    def __init__(self, name, **counts):
+        self.name = name
+        self.counts = dict(counts)
+
+    def Count(self, **counts):
+        for name, value in counts.items():
+            self.counts[name] = self.counts.get(name, 0) + value
+
+    def __enter__(self):
+        parent = Current()
+        self.path = f'{parent}/{self.name}' if parent else self.name
+        if not hasattr(_stack, 'names'):
+            _stack.names = []
+        _stack.names.append(self.path)
+        self.rss = RSS()
+        self.started = time.time()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exctype, value, traceback):
+        seconds = time.perf_counter() - self.start
+        _stack.names.pop()
+        rss = RSS()
+        record = {'span': self.path, 'start': self.started, 'seconds': seconds, 'pid': os.getpid(),
+                  'rss_mb': rss, 'rss_delta_mb': rss - self.rss if rss is not None and self.rss is not None else None,
+                  'counts': self.counts}
+        if exctype is not None:
+            record['error'] = exctype.__name__
+        METRICS.Record(record)
+        return False
+
+
+@contextmanager
+def Collect():
+    """Collects the spans this process finishes inside the block into the yielded list rather than recording
+    them, so a worker can return them to its parent (see Ingest). Their names start afresh inside the block, a
+    forked worker doesn't inherit its parent's open spans."""
+    records = []
+    names = getattr(_stack, 'names', [])
+    _stack.names = []
+    with METRICS.lock:
+        METRICS.collectors.append(records)
+    try:
+        yield records
+    finally:
+        with METRICS.lock:
+            METRICS.collectors.remove(records)
+        _stack.names = names
+
+
+def Ingest(records):
+    """Records spans collected in a worker, nested under this thread's current span"""
+    parent = Current()
+    for record in records:
+        METRICS.Record(dict(record, span=f"{parent}/{record['span']}" if parent else record['span']))
+
+
+@contextmanager
+def Profile(path):
+    """Profiles the block with cProfile & dumps the stats to path (read them with pstats or snakeviz)"""
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield profiler
+    finally:
+        profiler.disable()
+        profiler.dump_stats(path)
+
+
+def RunProfiled(path, function, *args, **kwargs):
+    """function(*args, **kwargs) profiled into path, picklable (with functools.partial) for worker processes"""
+    with Profile(path):
+        return function(*args, **kwargs)
@@ -0,0 +1,99 @@
+import codecs
+import json
+
+WHITESPACE = ' \t\n\r'
+
+
+class JSONStream(object):
+    """Incremental reader of a JSON document arriving as chunks of bytes
+
+    Only the text not consumed yet is buffered, values are decoded one at a time with json.JSONDecoder.raw_decode
+    & more chunks are read whenever a value doesn't fit in the buffer yet.
+    """
+
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+        self.decoder = json.JSONDecoder()
+        self.text = codecs.getincrementaldecoder('utf-8')()
+        self.buffer = ''
+        self.position = 0
+        self.done = False
+
+    def Fill(self):
+        """Reads at least as much text as is pending (so re-decoding stays linear), returns False at the end"""
+        if self.done:
+            return False
+        pending = self.buffer[self.position:]
+        wanted = max(len(pending), 1)
+        parts = [pending]
+        read = 0
+        while read < wanted:
+            chunk = next(self.chunks, None)
+            if chunk is None:
+                parts.append(self.text.decode(b'', final=True))
+                self.done = True
+                break
+            part = self.text.decode(chunk)
+            parts.append(part)
+            read += len(part)
+        self.buffer = ''.join(parts)
+        self.position = 0
+        return True
+
+    def Peek(self):
+        """Next non whitespace character, '' at the end of the document"""
+        while True:
+            while self.position < len(self.buffer) and self.buffer[self.position] in WHITESPACE:
+                self.position += 1
+            if self.position < len(self.buffer):
+                return self.buffer[self.position]
+            if not self.Fill():
+                return ''
+
+    def Expect(self, characters):
+        character = self.Peek()
+        if character not in characters or not character:
+            raise ValueError(f"Expected one of {characters!r} at stream offset {self.position}, got {character!r}")
+        self.position += 1
+        return character
+
+    def Value(self):
+        """Decodes the next complete value"""
+        self.Peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.position)
+                # A value ending right at the buffer end may be a truncated number, literal or key
+                if end < len(self.buffer) or self.done:
+                    self.position = end
+                    return value
+            except json.JSONDecodeError:
+                if self.done:
+                    raise
+            self.Fill()
+
+    def Items(self, key):
+        """Yields the elements of the array stored under key in the top level object one by one"""
+        self.Expect('{')
+        if self.Peek() == '}':
+            raise KeyError(key)
+        while True:
+            name = self.Value()
+            self.Expect(':')
+            if name == key:
+                self.Expect('[')
+                if self.Peek() == ']':
+                    self.position += 1
+                    return
+                while True:
+                    yield self.Value()
+                    if self.Expect(',]') == ']':
+                        return
+            self.Value()
+            if self.Expect(',}') == '}':
+                raise KeyError(key)
+
+
+def IterArray(chunks, key):
+    """Yields the elements of the top level `key` array of a JSON document given as chunks of bytes"""
+    return JSONStream(chunks).Items(key)
@@ -0,0 +1,116 @@
+import logging
+import multiprocessing
+import threading
+import traceback
+
+from PyQt5.QtCore import QObject, QRunnable, pyqtSignal
+
+from Instrument import Collect, Ingest
+
+# Progress queue & cancel event of the current worker process, see RunProcess
+_progress = None
+_cancel = None
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class JobSignals(QObject):
+    progress = pyqtSignal(str, int)
+    finished = pyqtSignal(object)
+    failed = pyqtSignal(str)
+    cancelled = pyqtSignal()
+
+
+def _InitProcess(progress, cancel):
+    global _progress, _cancel
+    _progress = progress
+    _cancel = cancel
+
+
+def _Report(message):
+    _progress.put(message)
+
+
+def _Cancelled():
+    return _cancel.is_set()
+
+
+def _CallWithProgress(function, args, cooperative):
+    options = {'progress': _Report, 'cancelled': _Cancelled} if cooperative else {'progress': _Report}
+    with Collect() as spans:
+        return function(*args, **options), spans
+
+
+class Job(QRunnable):
+    """Runs function(job, *args) on a QThreadPool thread
+
+    The function never touches widgets, it reports through job.Progress & its return value, all of which reach
+    the window as queued Qt signals. Cancel() is cooperative: the function checks job.Cancelled()/job.Check()
+    between stages, while stages run with RunProcess are terminated outright.
+    """
+
+    def __init__(self, function, *args):
+        super(Job, self).__init__()
+        self.function = function
+        self.args = args
+        self.signals = JobSignals()
+        self.cancel = threading.Event()
+
+    def Progress(self, message, type=20):
+        self.signals.progress.emit(message, type)
+
+    def Cancel(self):
+        self.cancel.set()
+
+    def Cancelled(self):
+        return self.cancel.is_set()
+
+    def Check(self):
+        if self.Cancelled():
+            raise JobCancelled()
+
+    def RunProcess(self, function, *args, poll=0.1, cooperative=False):
+        """Runs function(*args, progress=...) in a fresh worker process so it doesn't hold this process' GIL
+
+        Progress messages of the worker are relayed as they arrive, the worker is killed if the job is cancelled.
+        When cooperative function also gets cancelled=..., a callable turning true on cancel, & is left to stop
+        (& clean up its partial output) by itself. The worker's spans are added to this process' metrics (see
+        Instrument.Ingest).
+        """
+        self.Check()
+        context = multiprocessing.get_context('spawn')
+        messages = context.SimpleQueue()
+        cancel = context.Event()
+        pool = context.Pool(1, initializer=_InitProcess, initargs=(messages, cancel))
+        try:
+            result = pool.apply_async(_CallWithProgress, (function, args, cooperative))
+            while True:
+                result.wait(poll)
+                while not messages.empty():
+                    self.Progress(messages.get())
+                if result.ready():
+                    value, spans = result.get()
+                    Ingest(spans)
+                    return value
+                if self.Cancelled():
+                    if not cooperative:
+                        raise JobCancelled()
+                    cancel.set()
+        finally:
+            pool.terminate()
+            pool.join()
+
+    def run(self):
+        try:
+            result = self.function(self, *self.args)
+            self.Check()
+        except JobCancelled:
+            self.signals.cancelled.emit()
+        except Exception:
+            error = traceback.format_exc()
+            logging.error(error)
+            self.signals.failed.emit(error)
+        else:
+            self.signals.finished.emit(result)
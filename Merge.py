@@ -0,0 +1,62 @@
+from collections import namedtuple
+
+MergeReport = namedtuple('MergeReport', ['matched', 'unmatched_feed', 'unmatched_locations', 'duplicates'])
+
+
+def NormaliseProvince(province):
+    """Maps the different spellings of "no province" used by the feeds to an empty string"""
+    if province is None:
+        return ''
+    province = str(province).strip()
+    if province.lower() in ('nan', 'none', 'null'):
+        return ''
+    return province
+
+
+def LocationKey(record):
+    """Normalised (country, province) key of a location or feed record"""
+    return record['country'].strip().casefold(), NormaliseProvince(record.get('province')).casefold()
+
+
+class LocationIndex(object):
+    """Index of a location list by normalised (country, province), built once & reused for every feed"""
+
+    def __init__(self, locations, key=LocationKey):
+        self.locations = locations
+        self.key = key
+        self.index = {}
+        for position, location in enumerate(locations):
+            self.index.setdefault(key(location), position)
+
+    def Find(self, record):
+        position = self.index.get(self.key(record))
+        return None if position is None else self.locations[position]
+
+    def Merge(self, records, apply):
+        """Calls apply(location, record) for every feed record with a matching location
+
+        Returns a MergeReport listing the matched count, the (country, province) of feed records without a
+        location, of locations without a feed record & of feed records matching an already merged location.
+        """
+        merged = set()
+        unmatched_feed = []
+        duplicates = []
+        for record in records:
+            key = self.key(record)
+            position = self.index.get(key)
+            if position is None:
+                unmatched_feed.append((record['country'], NormaliseProvince(record.get('province'))))
+                continue
+            if position in merged:
+                duplicates.append((record['country'], NormaliseProvince(record.get('province'))))
+                continue
+            apply(self.locations[position], record)
+            merged.add(position)
+        unmatched_locations = [(location['country'], NormaliseProvince(location.get('province')))
+                               for position, location in enumerate(self.locations) if position not in merged]
+        return MergeReport(len(merged), unmatched_feed, unmatched_locations, duplicates)
+
+
+def MergeFeed(locations, records, apply, key=LocationKey):
+    """Merges a secondary feed into the location list, see LocationIndex.Merge"""
+    return LocationIndex(locations, key).Merge(records, apply)
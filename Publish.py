@@ -0,0 +1,81 @@
+import os
+import shutil
+import tempfile
+import time
+
+from Artifacts import ENCODINGS, Variant, WriteAtomic
+
+POINTER = 'CURRENT'
+PARTIAL = '.partial'
+
+
+class Builds(object):
+    """Versioned artifact sets under root/builds, published by atomically switching the builds/CURRENT pointer
+
+    A build is prepared in a fresh version directory holding hard links to the current version's files, so only
+    changed artifacts are rebuilt. Every writer replaces files (see Artifacts.WriteAtomic) rather than rewriting
+    them, so the linked files of older versions never change & readers of any version never see a partial file.
+    Published versions beyond the keep most recent ones are removed.
+    """
+
+    def __init__(self, root='.', keep=3):
+        self.root = root
+        self.path = os.path.join(root, 'builds')
+        self.keep = keep
+
+    def Current(self):
+        """Directory of the published version, None before the first publish"""
+        try:
+            with open(os.path.join(self.path, POINTER)) as f:
+                version = f.read().strip()
+        except FileNotFoundError:
+            return None
+        return os.path.join(self.path, version) if version else None
+
+    def Prepare(self, names):
+        """Creates a new (unpublished) version directory, linking in the names (& their compressed variants)
+        found in the current version, or in root before the first publish"""
+        os.makedirs(self.path, exist_ok=True)
+        version = tempfile.mkdtemp(prefix=time.strftime('%Y%m%d-%H%M%S-'), suffix=PARTIAL, dir=self.path)
+        source = self.Current() or self.root
+        for name in names:
+            for filename in [name] + [Variant(name, encoding) for encoding in ENCODINGS]:
+                if os.path.exists(os.path.join(source, filename)):
+                    Link(os.path.join(source, filename), os.path.join(version, filename))
+        return version
+
+    def Publish(self, version):
+        """Makes a prepared version the served one & removes the old ones, returns its published directory"""
+        published = version[:-len(PARTIAL)]
+        os.rename(version, published)
+        WriteAtomic(os.path.join(self.path, POINTER), os.path.basename(published))
+        self.Collect()
+        return published
+
+    def Discard(self, version):
+        shutil.rmtree(version, ignore_errors=True)
+
+    def Collect(self, stale=24 * 3600):
+        """Removes published versions older than the keep most recent ones (never the current one) & partial
+        versions left behind for longer than stale seconds"""
+        current = self.Current()
+        versions = []
+        for entry in os.scandir(self.path):
+            if not entry.is_dir():
+                continue
+            if entry.name.endswith(PARTIAL):
+                if time.time() - entry.stat().st_mtime > stale:
+                    shutil.rmtree(entry.path, ignore_errors=True)
+            elif entry.path != current:
+                versions.append(entry)
+        versions.sort(key=lambda entry: entry.name, reverse=True)
+        for entry in versions[max(self.keep - 1, 0):]:
+            shutil.rmtree(entry.path, ignore_errors=True)
+
+
+def Link(source, target):
+    """Hard links source to target, copying where links aren't supported"""
+    try:
+        os.link(source, target)
+    except OSError:
+        shutil.copy2(source, target)
@@ -0,0 +1,111 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from Indicators import INDICATORS
+
+# metric query parameter -> aggregated table (see Tables.Tables) its series come from
+SERIES = {'daily': 'timeline', 'cumulative': 'accumulated'}
+
+
+class Series(object):
+    """An aggregated table as one dates x countries matrix per numeric column
+
+    Aggregate emits every country on every date in the same order, so the columns reshape without a pivot.
+    Columns in skip are left out.
+    """
+
+    def __init__(self, table, skip=()):
+        dates = table['date'].nunique()
+        count = len(table) // dates if dates else 0
+        self.countries = table['country'].to_numpy()[:count].tolist()
+        self.positions = {country.lower(): i for i, country in enumerate(self.countries)}
+        self.columns = {}
+        for column in table.columns:
+            values = table[column].to_numpy()
+            if column not in ('date', 'Date', *skip) and values.dtype.kind in 'iuf':
+                self.columns[column] = values.reshape(dates, count)
+
+
+class SeriesQuery(object):
+    """Answers the /api queries of the artifact server from the in-memory aggregated tables
+
+    Encoded responses are cached (least recently used first out), a new SeriesQuery is made for every new set of
+    tables, so an update replaces the cache along with the data.
+    """
+
+    def __init__(self, tables, cache_size=512):
+        self.days = tables.axis.Days
+        self.dates = [str(day) for day in self.days]
+        # The indicators are computed from the cumulative counts, so only the cumulative series has them
+        self.series = {metric: Series(getattr(tables, source), INDICATORS if metric == 'daily' else ())
+                       for metric, source in SERIES.items()}
+        self.cache = OrderedDict()
+        self.cache_size = cache_size
+        self.lock = threading.Lock()
+
+    def Answer(self, path, params):
+        """(status, encoded JSON, ETag) of a query, params as parsed by urllib.parse.parse_qs"""
+        key = path, tuple(sorted((name, tuple(values)) for name, values in params.items()))
+        with self.lock:
+            cached = self.cache.get(key)
+            if cached is not None:
+                self.cache.move_to_end(key)
+                return cached
+        if path == '/api/countries':
+            status, payload = 200, self.Countries()
+        elif path == '/api/series':
+            status, payload = self.Series(params)
+        else:
+            status, payload = 404, {'error': f"Unknown endpoint {path}"}
+        content = json.dumps(payload, separators=(',', ':')).encode()
+        answer = status, content, f'"{hashlib.sha1(content).hexdigest()}"'
+        with self.lock:
+            self.cache[key] = answer
+            while len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        return answer
+
+    def Countries(self):
+        return {'countries': self.series['daily'].countries, 'from': self.dates[0] if self.dates else None,
+                'to': self.dates[-1] if self.dates else None, 'metrics': list(SERIES),
+                'fields': {metric: list(series.columns) for metric, series in self.series.items()}}
+
+    def Series(self, params):
+        """/api/series?country=US&country=Italy&from=2020-03-01&to=2020-04-30&metric=daily&fields=confirmed,deaths
+
+        country is required & may repeat (names can contain commas), from/to are inclusive ISO dates defaulting
+        to the whole range, metric is daily (default) or cumulative & fields defaults to every column of the metric.
+        The indicator columns (see Indicators) are cumulative figures, they are fields of metric=cumulative only.
+        """
+        metric = params.get('metric', ['daily'])[0]
+        if metric not in self.series:
+            return 400, {'error': f"metric must be one of {', '.join(SERIES)}"}
+        series = self.series[metric]
+        countries = params.get('country')
+        if not countries:
+            return 400, {'error': "country is required"}
+        fields = params['fields'][0].split(',') if 'fields' in params else list(series.columns)
+        unknown = [field for field in fields if field not in series.columns]
+        if unknown:
+            return 400, {'error': f"Unknown fields {', '.join(unknown)}"}
+        try:
+            start = np.searchsorted(self.days, np.datetime64(params['from'][0], 'D')) if 'from' in params else 0
+            stop = (np.searchsorted(self.days, np.datetime64(params['to'][0], 'D'), side='right')
+                    if 'to' in params else len(self.days))
+        except ValueError:
+            return 400, {'error': "from & to must be YYYY-MM-DD dates"}
+        payload = {'metric': metric, 'dates': self.dates[start:stop], 'countries': {}}
+        for country in countries:
+            position = series.positions.get(country.lower())
+            if position is None:
+                return 404, {'error': f"Unknown country {country}"}
+            name = series.countries[position]
+            payload['countries'][name] = {}
+            for field in fields:
+                values = series.columns[field][start:stop, position]
+                payload['countries'][name][field] = (values.round(4) if values.dtype.kind == 'f' else values).tolist()
+        return 200, payload
@@ -0,0 +1,266 @@
+from collections import namedtuple
+
+import cv2
+import numpy as np
+
+from Artifacts import AtomicFile
+from Instrument import Span
+
+# Native video renderer: draws the frames of the bubble & bar plots straight into numpy buffers with cv2, tweening
+# between the decimated dates. Export's plotly renderer stays for fidelity exports & the map.
+
+# kind: 'bubble' or 'bar', x/y: columns on the axes (bars only use y), size/color: columns sized & coloured by,
+# linear: columns drawn on linear rather than log scales
+RasterPlot = namedtuple('RasterPlot', ['kind', 'x', 'y', 'size', 'color', 'linear', 'title'])
+
+RASTER_PLOTS = {
+    'Bubble': RasterPlot('bubble', 'deaths', 'recovered', 'confirmed', 'confirmed', (), 'COVID19'),
+    'BarCases': RasterPlot('bar', None, 'confirmed', None, 'confirmed', ('confirmed',), 'Confirmed Cases'),
+    'BarDeaths': RasterPlot('bar', None, 'deaths', None, 'deaths', ('deaths',), 'Deaths'),
+    'EBubble': RasterPlot('bubble', 'recovered', 'confirmed', 'DeathRate', 'DeathRate', ('DeathRate',),
+                          'COVID19 Death Rate'),
+}
+
+WIDTH, HEIGHT = 1280, 720
+LEFT, TOP, RIGHT, BOTTOM = 90, 60, 150, 70
+MAX_RADIUS = 50
+# Distance of the largest values from the plot's edges, so their bubbles aren't cut off
+INSET = 30
+BAR_LABELS = 160
+PAPER = (255, 255, 255)
+PLOT = (246, 236, 229)
+GRID = (255, 255, 255)
+INK = (68, 42, 42)
+BAR = (250, 110, 99)
+FONT = cv2.FONT_HERSHEY_SIMPLEX
+# Viridis in BGR, indexed by a 0-255 position on the colour scale
+VIRIDIS = cv2.applyColorMap(np.arange(256, dtype=np.uint8).reshape(-1, 1), cv2.COLORMAP_VIRIDIS)[:, 0]
+
+
+def Format(value):
+    """Short tick label of a count, e.g. 2.5k or 10M"""
+    for factor, suffix in ((1e9, 'B'), (1e6, 'M'), (1e3, 'k')):
+        if abs(value) >= factor:
+            return f'{value / factor:.3g}{suffix}'
+    return f'{value:.3g}'
+
+
+class Scale(object):
+    """Maps values onto [start, end] pixels, on a log10(1 + value) scale (so 0 sits on the axis) unless linear"""
+
+    def __init__(self, high, start, end, linear=False):
+        self.linear = linear
+        self.start = start
+        self.end = end
+        self.high = max(float(self.Transform(high)), 1e-9)
+
+    def Transform(self, values):
+        values = np.clip(np.asarray(values, dtype=np.float64), 0, None)
+        return values if self.linear else np.log10(1 + values)
+
+    def Fraction(self, values):
+        return self.Transform(values) / self.high
+
+    def __call__(self, values):
+        return self.start + (self.end - self.start) * self.Fraction(values)
+
+    def Ticks(self):
+        if not self.linear:
+            return [0] + [10 ** power for power in range(1, int(self.high) + 1)]
+        step = 10 ** np.floor(np.log10(self.high / 4)) if self.high > 4e-9 else 1
+        step *= next(factor for factor in (1, 2, 5, 10) if self.high / (step * factor) <= 5)
+        return list(np.arange(0, self.high + step / 2, step))
+
+
+def Extents(plot, frames):
+    """Largest value of every column of plot over all frames, so the axes stay put through the video"""
+    columns = {column for column in (plot.x, plot.y, plot.size, plot.color) if column is not None}
+    return {column: max((float(frame[column].max()) for frame in frames if len(frame)), default=0)
+            for column in columns}
+
+
+def BubbleScales(plot, extents):
+    return (Scale(extents[plot.x], LEFT, WIDTH - RIGHT - INSET, plot.x in plot.linear),
+            Scale(extents[plot.y], HEIGHT - BOTTOM, TOP + INSET, plot.y in plot.linear))
+
+
+def Geometry(plot, frame, extents):
+    """Pixel geometry of every country of one frame, {country: array}
+
+    Bubbles: (x, y, radius, colour position), bars: (rank, length, value, frame maximum).
+    """
+    countries = frame['country'].tolist()
+    if plot.kind == 'bubble':
+        x, y = BubbleScales(plot, extents)
+        x, y = x(frame[plot.x]), y(frame[plot.y])
+        # Bubble areas are proportional to their value, as plotly sizes them
+        radius = MAX_RADIUS * np.sqrt(Scale(extents[plot.size], 0, 1, True).Fraction(frame[plot.size]))
+        color = 255 * Scale(extents[plot.color], 0, 1, plot.color in plot.linear).Fraction(frame[plot.color])
+        values = np.column_stack([x, y, np.maximum(radius, 2), color])
+    else:
+        y = frame[plot.y].to_numpy(dtype=np.float64)
+        rank = np.empty(len(y))
+        rank[np.argsort(-y, kind='stable')] = np.arange(len(y))
+        high = max(y.max(), 1) if len(y) else 1
+        values = np.column_stack([rank, y / high, y, np.full(len(y), high)])
+    return dict(zip(countries, values))
+
+
+def Tween(before, after, t):
+    """Geometry t of the way from before to after, with countries fading in & out as they enter or leave
+
+    Returns (countries, geometry rows, presence 0-1).
+    """
+    countries = list(dict.fromkeys(list(before) + list(after)))
+    start = np.array([before.get(country, after.get(country)) for country in countries])
+    end = np.array([after.get(country, before.get(country)) for country in countries])
+    present = np.array([(country in before) * (1 - t) + (country in after) * t for country in countries])
+    if not countries:
+        return countries, np.zeros((0, 4)), present
+    return countries, start + (end - start) * t, present
+
+
+def Text(image, text, origin, scale=0.45, color=INK, thickness=1, align='left'):
+    (width, height), _ = cv2.getTextSize(text, FONT, scale, thickness)
+    x, y = origin
+    if align == 'right':
+        x -= width
+    elif align == 'center':
+        x -= width // 2
+    cv2.putText(image, text, (int(x), int(y + height / 2)), FONT, scale, color, thickness, cv2.LINE_AA)
+
+
+def Canvas():
+    image = np.empty((HEIGHT, WIDTH, 3), dtype=np.uint8)
+    image[:] = PAPER
+    image[TOP:HEIGHT - BOTTOM, LEFT:WIDTH - RIGHT] = PLOT
+    return image
+
+
+def ColorBar(image, scale, title):
+    """Viridis colour bar right of the plot with ticks of the colour scale"""
+    left, right = WIDTH - RIGHT + 30, WIDTH - RIGHT + 50
+    top, bottom = TOP + 20, HEIGHT - BOTTOM
+    positions = np.linspace(255, 0, bottom - top).astype(np.uint8)
+    image[top:bottom, left:right] = VIRIDIS[positions][:, np.newaxis]
+    Text(image, title, (left, TOP), 0.45)
+    axis = Scale(scale.high if scale.linear else 10 ** scale.high - 1, bottom, top, scale.linear)
+    for tick in scale.Ticks():
+        y = axis(tick)
+        if top <= y <= bottom:
+            cv2.line(image, (right, int(y)), (right + 4, int(y)), INK, 1)
+            Text(image, Format(tick), (right + 8, y), 0.4)
+
+
+def BubbleAxes(image, plot, extents):
+    x, y = BubbleScales(plot, extents)
+    for tick in x.Ticks():
+        position = int(x(tick))
+        cv2.line(image, (position, TOP), (position, HEIGHT - BOTTOM), GRID, 1)
+        Text(image, Format(tick), (position, HEIGHT - BOTTOM + 14), 0.4, align='center')
+    for tick in y.Ticks():
+        position = int(y(tick))
+        cv2.line(image, (LEFT, position), (WIDTH - RIGHT, position), GRID, 1)
+        Text(image, Format(tick), (LEFT - 8, position), 0.4, align='right')
+    Text(image, plot.x, ((LEFT + WIDTH - RIGHT) // 2, HEIGHT - BOTTOM + 40), 0.5, align='center')
+    Text(image, plot.y, (LEFT - 8, TOP - 14), 0.5, align='right')
+
+
+def DrawBubbles(image, plot, extents, countries, geometry, present):
+    BubbleAxes(image, plot, extents)
+    ColorBar(image, Scale(extents[plot.color], 0, 1, plot.color in plot.linear), plot.color)
+    # Largest bubbles first, so the small ones stay visible on top of them
+    for i in np.argsort(-geometry[:, 2] * present, kind='stable'):
+        if present[i] <= 0:
+            continue
+        x, y, radius, color = geometry[i]
+        center = (int(round(x)), int(round(y)))
+        radius = max(int(round(radius * present[i])), 1)
+        fill = tuple(int(channel) for channel in VIRIDIS[int(np.clip(color, 0, 255))])
+        cv2.circle(image, center, radius, fill, -1, cv2.LINE_AA)
+        cv2.circle(image, center, radius, PAPER, 1, cv2.LINE_AA)
+        if present[i] > 0.5:
+            Text(image, countries[i], center, 0.35, align='center')
+
+
+def DrawBars(image, plot, countries, geometry, present):
+    """Horizontal bars ranked top down (a bar race), each frame scaled to its largest bar"""
+    if not countries:
+        return
+    left, right = LEFT + BAR_LABELS, WIDTH - RIGHT
+    pitch = (HEIGHT - BOTTOM - TOP) / max(len(countries), 1)
+    high = float(geometry[:, 3].max())
+    axis = Scale(high, left, right, True)
+    for tick in axis.Ticks():
+        position = int(axis(tick))
+        if position <= right:
+            cv2.line(image, (position, TOP), (position, HEIGHT - BOTTOM), GRID, 1)
+            Text(image, Format(tick), (position, HEIGHT - BOTTOM + 14), 0.4, align='center')
+    Text(image, plot.y, ((left + right) // 2, HEIGHT - BOTTOM + 40), 0.5, align='center')
+    for i, (rank, length, value, _) in enumerate(geometry):
+        if present[i] <= 0:
+            continue
+        top = TOP + rank * pitch + pitch * 0.1
+        bottom = top + pitch * 0.8 * present[i]
+        end = left + (right - left) * length
+        cv2.rectangle(image, (left, int(top)), (int(end), int(bottom)), BAR, -1)
+        middle = (top + bottom) / 2
+        Text(image, countries[i], (left - 8, middle), 0.4, align='right')
+        Text(image, Format(value), (end + 6, middle), 0.4)
+
+
+def DrawFrame(plot, extents, countries, geometry, present, label):
+    """One BGR frame buffer of plot"""
+    image = Canvas()
+    if plot.kind == 'bubble':
+        DrawBubbles(image, plot, extents, countries, geometry, present)
+    else:
+        DrawBars(image, plot, countries, geometry, present)
+    Text(image, f'{plot.title} - {label}', (LEFT, TOP // 2), 0.7, thickness=2)
+    return image
+
+
+def RasterFrames(plot, frames, tween=4):
+    """Yields the BGR buffers of every date of plot, tween frames per decimated date
+
+    Positions, sizes, colours & bar ranks are interpolated towards the next date, the last date is shown once.
+    """
+    plot = RASTER_PLOTS[plot]
+    frames = list(frames)
+    extents = Extents(plot, frames)
+    geometries = [Geometry(plot, frame, extents) for frame in frames]
+    for i, frame in enumerate(frames):
+        label = frame['Date'].iloc[0] if len(frame) else ''
+        last = i + 1 == len(frames)
+        steps = 1 if last else tween
+        with Span('draw', frames=steps, rows=len(frame)):
+            images = [DrawFrame(plot, extents, *Tween(geometries[i], geometries[i if last else i + 1],
+                                                      step / steps), label) for step in range(steps)]
+        yield images
+
+
+def ExportRaster(plot, frames, filename, fps=4, tween=4, progress=None, cancelled=None):
+    """Draws the frames of plot & writes them straight into a video file, at fps dates per second
+
+    The video is written to a temporary file that replaces filename once complete, when cancelled() turns true
+    the export stops & the partial file is removed. Returns the number of dates written, progress(done) is called
+    as each one is.
+    """
+    progress = progress or (lambda done: None)
+    cancelled = cancelled or (lambda: False)
+    written = 0
+    with AtomicFile(filename) as target:
+        out = cv2.VideoWriter(target.temp, cv2.VideoWriter_fourcc(*'DIVX'), fps * tween, (WIDTH, HEIGHT))
+        try:
+            for images in RasterFrames(plot, frames, tween):
+                if cancelled():
+                    target.Discard()
+                    break
+                with Span('encode', frames=len(images)):
+                    for image in images:
+                        out.write(image)
+                written += 1
+                progress(written)
+        finally:
+            out.release()
+    return written
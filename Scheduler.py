@@ -0,0 +1,99 @@
+import multiprocessing
+import os
+import time
+import traceback
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+from Artifacts import InputHash, Precompress
+from Instrument import Collect, Ingest, Span
+
+# function(*inputs, **options) builds artifact, only inputs decide whether it is up to date (options say where
+# it is written, not what it is made of)
+BuildTask = namedtuple('BuildTask', ['artifact', 'title', 'function', 'inputs', 'options'], defaults=[{}])
+TaskResult = namedtuple('TaskResult', ['artifact', 'status', 'duration', 'error'])
+
+
+def RunTask(function, inputs, artifact, options):
+    """Runs one build task inside a worker, returning its duration, traceback instead of raising & spans
+
+    The compressed variants of the files the task wrote (or of artifact) are produced in the worker too, so the
+    server never compresses.
+    """
+    start = time.perf_counter()
+    with Collect() as spans:
+        try:
+            with Span(os.path.basename(artifact)) as span:
+                for written in function(*inputs, **options) or [artifact]:
+                    Precompress(written)
+                    span.Count(bytes=os.path.getsize(written))
+            return time.perf_counter() - start, None, spans
+        except Exception:
+            return time.perf_counter() - start, traceback.format_exc(), spans
+
+
+class BuildScheduler(object):
+    """Runs independent artifact builds concurrently in a process pool
+
+    A failing task only fails itself. A crashing worker breaks the whole pool, so the tasks it took down with it
+    are run again one per pool & only the one that crashes again fails. progress(message) is called as tasks
+    start & finish, and with a manifest, tasks whose inputs did not change since their last successful build
+    are skipped.
+    """
+
+    def __init__(self, workers=None, progress=None, manifest=None):
+        self.workers = workers
+        self.progress = progress or (lambda message: None)
+        self.manifest = manifest
+
+    def Run(self, tasks):
+        results = []
+        pending = []
+        for task in tasks:
+            digest = InputHash(*task.inputs) if self.manifest is not None else None
+            if digest is not None and self.manifest.IsCurrent(task.artifact, digest):
+                self.progress(f"{task.title} Is Up To Date")
+                results.append(TaskResult(task.artifact, 'skipped', 0.0, None))
+                continue
+            pending.append((task, digest))
+        if not pending:
+            return results
+        self.progress(f"Generating {', '.join(task.title for task, digest in pending)}")
+        built = []
+        for task, digest in self.RunPool(pending, self.workers, built, len(pending)):
+            self.RunPool([(task, digest)], 1, built, len(pending), isolated=True)
+        return results + built
+
+    def RunPool(self, pending, workers, results, total, isolated=False):
+        """Runs the (task, digest) pairs in one pool, appending their TaskResults to results
+
+        Returns the pairs lost to a crashed worker, unless isolated when they are failed instead.
+        """
+        crashed = []
+        # spawned, a forked worker could inherit a lock (e.g. Instrument.METRICS') held by another thread
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+            futures = {}
+            for task, digest in pending:
+                futures[pool.submit(RunTask, task.function, task.inputs, task.artifact, task.options)] = task, digest
+            for future in as_completed(futures):
+                task, digest = futures[future]
+                try:
+                    duration, error, spans = future.result()
+                    Ingest(spans)
+                except BrokenProcessPool as e:
+                    if not isolated:
+                        crashed.append((task, digest))
+                        continue
+                    duration, error = 0.0, repr(e)
+                except Exception as e:
+                    duration, error = 0.0, repr(e)
+                if error is None:
+                    if self.manifest is not None:
+                        self.manifest.Record(task.artifact, digest)
+                    results.append(TaskResult(task.artifact, 'done', duration, None))
+                    self.progress(f"Generated {task.title} in {duration:.1f}s ({len(results)}/{total})")
+                else:
+                    results.append(TaskResult(task.artifact, 'failed', duration, error))
+                    self.progress(f"Generating {task.title} Failed ({len(results)}/{total})")
+        return crashed
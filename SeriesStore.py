@@ -0,0 +1,196 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+
+from Artifacts import TempFile
+from DateAxis import DateAxis
+
+METRICS = ('confirmed', 'deaths', 'recovered')
+
+
+class SeriesStore(object):
+    """Columnar COVID19 time series: one date axis, one location table & dense (locations x dates) arrays"""
+
+    def __init__(self, dates, locations, series, axis=None):
+        self.Dates = np.asarray(dates, dtype=str)
+        self.Axis = axis if axis is not None else DateAxis(self.Dates)
+        self.Locations = locations
+        self.Series = series
+
+    def __len__(self):
+        return len(self.Locations['country'])
+
+    @property
+    def Confirmed(self):
+        return self.Series['confirmed']
+
+    @property
+    def Deaths(self):
+        return self.Series['deaths']
+
+    @property
+    def Recovered(self):
+        return self.Series['recovered']
+
+    def Slice(self, start, stop=None):
+        """Store restricted to the dates [start:stop], sharing the location table & array memory"""
+        series = {metric: values[:, start:stop] for metric, values in self.Series.items()}
+        return SeriesStore(self.Dates[start:stop], self.Locations, series, self.Axis.Slice(start, stop))
+
+    def SameLocations(self, other):
+        """Whether other holds the same locations, with & without recovered series (Aggregate leaves the latter
+        out, so a flipped flag changes which countries the aggregated tables hold)"""
+        return all(np.array_equal(self.Locations[key], other.Locations[key])
+                   for key in ('country', 'province', 'has_recovered'))
+
+    def NewSince(self, previous):
+        """Index of the first date missing from previous, 0 if this store can't be treated as an extension of it
+
+        The feeds resend the whole history, so previous' dates must also hold the same values: an upstream
+        correction of a past day rebuilds everything rather than being dropped.
+        """
+        if previous is None or len(previous.Dates) == 0 or not self.SameLocations(previous):
+            return 0
+        count = len(previous.Dates)
+        if count > len(self.Dates) or not np.array_equal(self.Dates[:count], previous.Dates):
+            return 0
+        if not all(np.array_equal(self.Series[metric][:, :count], values)
+                   for metric, values in previous.Series.items()):
+            return 0
+        return count
+
+    def Extend(self, newer):
+        """Appends the dates of newer past this store's last date, keeping the already stored columns
+
+        Falls back to newer as a whole when its locations or earlier dates differ.
+        """
+        start = newer.NewSince(self)
+        if start == 0:
+            return newer
+        if start == len(newer.Dates):
+            return self
+        series = {metric: np.concatenate([values, newer.Series[metric][:, start:]], axis=1)
+                  for metric, values in self.Series.items()}
+        return SeriesStore(newer.Dates, newer.Locations, series, newer.Axis)
+
+    def Hash(self):
+        """Content hash of the dates, location table & series, identifying what was derived from this store"""
+        digest = hashlib.sha1()
+        for name, values in [('dates', self.Dates)] + sorted(self.Locations.items()) + sorted(self.Series.items()):
+            values = np.ascontiguousarray(values)
+            digest.update(f'{name}:{values.dtype.str}:{values.shape}'.encode())
+            digest.update(values.tobytes())
+        return digest.hexdigest()
+
+    @classmethod
+    def FromLocations(cls, locations):
+        """Builds a store from the COVID19Py location list (the old data.json layout)"""
+        builder = SeriesBuilder()
+        for location in locations:
+            builder.Add(location)
+        return builder.Build()
+
+    @classmethod
+    def FromJSON(cls, path='data.json'):
+        """Imports an old style data.json/daily.json file"""
+        with open(path) as f:
+            locations = json.load(f)
+        return cls.FromLocations(locations)
+
+    @classmethod
+    def Load(cls, path='data.npz'):
+        with np.load(path, allow_pickle=False) as archive:
+            dates = archive['dates']
+            locations = {key[4:]: archive[key] for key in archive.files if key.startswith('loc_')}
+            series = {key[7:]: archive[key] for key in archive.files if key.startswith('series_')}
+        return cls(dates, locations, series)
+
+    def Save(self, path='data.npz'):
+        """Writes the store as an uncompressed .npz so loading is a straight memory copy"""
+        arrays = {'dates': self.Dates}
+        arrays.update({f'loc_{name}': values for name, values in self.Locations.items()})
+        arrays.update({f'series_{name}': values for name, values in self.Series.items()})
+        temp = TempFile(path)
+        np.savez(temp, **arrays)
+        os.replace(temp, path)
+
+
+class SeriesBuilder(object):
+    """Fills a store one location record at a time, so records can be dropped as soon as they are added
+
+    The date axis is taken from the first record, rows are written into preallocated arrays that double in
+    capacity when full.
+    """
+
+    TEXT = ('country', 'country_code', 'province', 'last_updated')
+
+    def __init__(self, capacity=256):
+        self.capacity = capacity
+        self.count = 0
+        self.dates = None
+        self.series = None
+        self.table = {'id': [], 'country': [], 'country_code': [], 'country_population': [], 'province': [],
+                      'last_updated': [], 'latitude': [], 'longitude': [], 'latest_confirmed': [],
+                      'latest_deaths': [], 'latest_recovered': [], 'has_recovered': []}
+
+    def Start(self, location):
+        self.dates = list(location['timelines']['confirmed']['timeline'])
+        self.rkeys = DateAxis(self.dates).RecoveredKeys
+        self.series = {metric: np.zeros((self.capacity, len(self.dates)), dtype=np.int64) for metric in METRICS}
+
+    def Grow(self):
+        self.capacity *= 2
+        for metric, values in self.series.items():
+            grown = np.zeros((self.capacity, values.shape[1]), dtype=np.int64)
+            grown[:self.count] = values[:self.count]
+            self.series[metric] = grown
+
+    def Add(self, location):
+        """Writes one location record (see FromLocations) into the next row, returns the row"""
+        if self.series is None:
+            self.Start(location)
+        if self.count == self.capacity:
+            self.Grow()
+        row = self.count
+        timelines = location['timelines']
+        for metric in ('confirmed', 'deaths'):
+            timeline = timelines[metric]['timeline']
+            self.series[metric][row] = [timeline.get(date, 0) for date in self.dates]
+        recovered = timelines['recovered']['timeline']
+        if len(recovered) > 0:
+            self.series['recovered'][row] = [recovered.get(key, 0) for key in self.rkeys]
+        table = self.table
+        table['id'].append(location.get('id', row))
+        table['country'].append(location['country'])
+        table['country_code'].append(location.get('country_code') or '')
+        table['country_population'].append(location.get('country_population') or 0)
+        table['province'].append(location.get('province') or '')
+        table['last_updated'].append(location.get('last_updated') or '')
+        coordinates = location.get('coordinates') or {}
+        table['latitude'].append(float(coordinates.get('latitude') or 'nan'))
+        table['longitude'].append(float(coordinates.get('longitude') or 'nan'))
+        for metric in METRICS:
+            table[f'latest_{metric}'].append(location['latest'].get(metric) or 0)
+        table['has_recovered'].append(len(recovered) > 0)
+        self.count += 1
+        return row
+
+    def Build(self):
+        table = {name: np.asarray(values, dtype=str if name in self.TEXT else None)
+                 for name, values in self.table.items()}
+        if self.series is None:
+            return SeriesStore([], table, {metric: np.zeros((0, 0), dtype=np.int64) for metric in METRICS})
+        series = {metric: values[:self.count].copy() if self.count < self.capacity else values
+                  for metric, values in self.series.items()}
+        return SeriesStore(self.dates, table, series)
+
+
+def LoadStore(path='data.npz', fallback='data.json'):
+    """Loads the columnar store, importing & caching the old JSON file if no store exists yet"""
+    if os.path.exists(path):
+        return SeriesStore.Load(path)
+    store = SeriesStore.FromJSON(fallback)
+    store.Save(path)
+    return store
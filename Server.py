@@ -0,0 +1,209 @@
+import hashlib
+import json
+import os
+import posixpath
+import threading
+from email.utils import formatdate, parsedate_to_datetime
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import parse_qs, urlparse
+
+from Artifacts import ENCODINGS, Variant, PrecompressStale
+from Charts import PAGES, PAYLOADS
+from Instrument import METRICS
+from Publish import POINTER, Builds
+
+CHARTS = list(PAGES) + list(PAYLOADS) + ['charts.js']
+LIBRARIES = ['plotly.min.js', 'qwebchannel.js']
+CONTENT_TYPES = {'.html': 'text/html; charset=utf-8', '.js': 'application/javascript', '.json': 'application/json'}
+
+
+class ArtifactServer(ThreadingHTTPServer):
+    """Threaded server for the generated artifact set only
+
+    Responses carry strong (content hash) ETags & Last-Modified, conditional requests are answered with 304,
+    precompressed .br/.gz variants are sent to clients accepting them & the static libraries are cached by the
+    browser for a year. Once builds are published (see Publish) the current version is served. /api queries are
+    answered by queries, a Query.SeriesQuery set (& replaced on every update) by the owner of the server.
+    """
+    daemon_threads = True
+
+    def __init__(self, address, directory='.', artifacts=CHARTS, libraries=LIBRARIES):
+        super(ArtifactServer, self).__init__(address, ArtifactHandler)
+        self.directory = directory
+        self.libraries = set(libraries)
+        self.artifacts = set(artifacts) | self.libraries
+        self.etags = {}
+        self.builds = Builds(directory)
+        self.root = None, directory
+        self.queries = None
+
+    def Root(self):
+        """Directory of the published version (directory itself before the first publish), the pointer is
+        checked on every request so a publish takes effect at once"""
+        try:
+            stat = os.stat(os.path.join(self.builds.path, POINTER))
+        except FileNotFoundError:
+            return self.directory
+        key = stat.st_ino, stat.st_mtime_ns, stat.st_size
+        if self.root[0] != key:
+            self.root = key, self.builds.Current() or self.directory
+        return self.root[1]
+
+    def ETag(self, path, stat):
+        """Content hash of path, recomputed only when its size or modification time changes"""
+        key = (stat.st_mtime_ns, stat.st_size)
+        cached = self.etags.get(path)
+        if cached is None or cached[0] != key:
+            digest = hashlib.sha1()
+            with open(path, 'rb') as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                    digest.update(chunk)
+            cached = key, f'"{digest.hexdigest()}"'
+            self.etags[path] = cached
+        return cached[1]
+
+
+class ArtifactHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # headers & body are separate writes, with Nagle a keep-alive client waits out its delayed ACK (~40ms) on each
+    disable_nagle_algorithm = True
+
+    def do_HEAD(self):
+        self.Serve(body=False)
+
+    def do_GET(self):
+        self.Serve(body=True)
+
+    def Serve(self, body):
+        url = urlparse(self.path)
+        path = url.path
+        if path in ('/metrics', '/metrics.json'):
+            self.ServeMetrics(path, body)
+            return
+        if path.startswith('/api/'):
+            self.ServeQuery(path, parse_qs(url.query), body)
+            return
+        name = posixpath.basename(path)
+        if name not in self.server.artifacts:
+            self.send_error(404)
+            return
+        path = os.path.join(self.server.Root(), name)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            self.send_error(404)
+            return
+        encoding, served = self.Negotiate(path, stat)
+        etag = self.server.ETag(path, stat)
+        if encoding:
+            etag = f'{etag[:-1]}-{encoding}"'
+        if self.NotModified(etag, stat.st_mtime):
+            self.send_response(304)
+            self.SendHeaders(name, etag, stat)
+            self.end_headers()
+            return
+        with open(served, 'rb') as f:
+            content = f.read()
+        self.send_response(200)
+        self.SendHeaders(name, etag, stat)
+        if encoding:
+            self.send_header('Content-Encoding', encoding)
+        self.send_header('Content-Type', CONTENT_TYPES.get(os.path.splitext(name)[1], 'application/octet-stream'))
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        if body:
+            self.wfile.write(content)
+
+    def ServeQuery(self, path, params, body):
+        queries = self.server.queries
+        if queries is None:
+            status, content, etag = 503, b'{"error":"Data Is Still Loading"}', None
+        else:
+            status, content, etag = queries.Answer(path, params)
+        if etag is not None and self.NotModified(etag, None):
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(content)))
+        self.send_header('Cache-Control', 'no-cache')
+        if etag is not None:
+            self.send_header('ETag', etag)
+        self.end_headers()
+        if body:
+            self.wfile.write(content)
+
+    def ServeMetrics(self, path, body):
+        """The span histograms of this process (see Instrument), in the Prometheus text format or as JSON"""
+        if path == '/metrics.json':
+            content = json.dumps(METRICS.Snapshot()).encode()
+            content_type = 'application/json'
+        else:
+            content = METRICS.Prometheus().encode()
+            content_type = 'text/plain; version=0.0.4'
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(content)))
+        self.send_header('Cache-Control', 'no-store')
+        self.end_headers()
+        if body:
+            self.wfile.write(content)
+
+    def SendHeaders(self, name, etag, stat):
+        self.send_header('ETag', etag)
+        self.send_header('Last-Modified', formatdate(stat.st_mtime, usegmt=True))
+        self.send_header('Vary', 'Accept-Encoding')
+        if name in self.server.libraries:
+            self.send_header('Cache-Control', 'public, max-age=31536000, immutable')
+        else:
+            self.send_header('Cache-Control', 'no-cache')
+
+    def NotModified(self, etag, mtime):
+        match = self.headers.get('If-None-Match')
+        if match is not None:
+            return match.strip() == '*' or etag in [tag.strip() for tag in match.split(',')]
+        since = self.headers.get('If-Modified-Since')
+        if since is not None:
+            try:
+                return int(mtime) <= parsedate_to_datetime(since).timestamp()
+            except (TypeError, ValueError):
+                return False
+        return False
+
+    def Negotiate(self, path, stat):
+        """Picks the best fresh precompressed variant of path the client accepts"""
+        accepted = [token.split(';')[0].strip() for token in self.headers.get('Accept-Encoding', '').split(',')]
+        for encoding in ENCODINGS:
+            if encoding not in accepted:
+                continue
+            variant = Variant(path, encoding)
+            try:
+                if os.stat(variant).st_mtime_ns >= stat.st_mtime_ns:
+                    return encoding, variant
+            except FileNotFoundError:
+                continue
+        return None, path
+
+    def log_message(self, format, *args):
+        pass
+
+
+def MakeServer(path='.', port=8000, background=False):
+    """The artifact server of the generated files in path on port, ready to serve_forever
+
+    Files with stale compressed variants are precompressed first, or on a daemon thread when background (they are
+    served uncompressed until their variants are written).
+    """
+    if background:
+        threading.Thread(name='precompress', target=PrecompressStale, args=(path, CHARTS + LIBRARIES),
+                         daemon=True).start()
+    else:
+        PrecompressStale(path, CHARTS + LIBRARIES)
+    return ArtifactServer(('', port), path)
+
+
+def StartServer(path='.', port=8000):
+    """Start the artifact server serving the generated files in path on port"""
+    MakeServer(path, port).serve_forever()
@@ -0,0 +1,150 @@
+import os
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from Aggregation import Aggregate, Extend, Latest
+from Artifacts import TempFile
+from DataDownload import UpdateData, GenerateDailyData, GetData
+from Indicators import AddIndicators, Population
+from Instrument import Span
+
+# Everything the charts & exports are generated from: the cumulative store, its daily differences, their shared
+# DateAxis, the per country timeline/accumulated tables (with their Indicators columns) & the latest per
+# location stats
+Tables = namedtuple('Tables', ['store', 'data', 'axis', 'timeline', 'accumulated', 'latest'])
+
+# Bumped whenever the layout or meaning of the snapshot's tables changes, older snapshots are then rebuilt
+SNAPSHOT_VERSION = 4
+SNAPSHOT_FRAMES = ('timeline', 'accumulated', 'latest')
+# Columns of the date major tables rebuilt from the store's DateAxis rather than saved
+AXIS_COLUMNS = ('date', 'Date')
+
+
+def BuildTables(store, tables=None, progress=None):
+    """Builds the aggregated tables of store
+
+    When tables were built from an earlier version of the same series only the new dates are aggregated & the
+    old tables are returned as they are if no new date arrived.
+    """
+    progress = progress or (lambda message: None)
+    start = store.NewSince(tables.store) if tables is not None else 0
+    if tables is not None and start == len(store.Dates):
+        progress("No New Data")
+        return tables
+    with Span('tables', locations=len(store), dates=len(store.Dates) - start):
+        progress("Parsing Data")
+        with Span('daily'):
+            data = GenerateDailyData(store)
+        if start:
+            progress("Generating Timeline")
+            with Span('timeline') as span:
+                timeline = Extend(tables.timeline, data, start)
+                span.Count(rows=len(timeline))
+            progress("Generating Accumulated Data Timeline")
+            with Span('accumulated') as span:
+                accumulated = Extend(tables.accumulated, store, start)
+                span.Count(rows=len(accumulated))
+        else:
+            progress("Generating Timeline")
+            with Span('timeline') as span:
+                timeline = Aggregate(data)
+                span.Count(rows=len(timeline))
+            progress("Generating Accumulated Data Timeline")
+            with Span('accumulated') as span:
+                accumulated = Aggregate(store)
+                span.Count(rows=len(accumulated))
+        progress("Computing Indicators")
+        with Span('indicators', rows=len(timeline) + len(accumulated)):
+            timeline, accumulated = AddIndicators([timeline, accumulated], accumulated, Population(store))
+        return Tables(store, data, store.Axis, timeline, accumulated, Latest(data))
+
+
+def SaveSnapshot(tables, path='tables.npz'):
+    """Writes the aggregated tables column by column into an uncompressed .npz
+
+    Text columns are saved as integer codes into one list of their values & the date columns aren't saved at
+    all, the snapshot records SNAPSHOT_VERSION & the hash of the store it was built from, see LoadSnapshot.
+    """
+    with Span('save_snapshot') as span:
+        arrays = {'version': np.array(SNAPSHOT_VERSION), 'source': np.array(tables.store.Hash())}
+        for name in SNAPSHOT_FRAMES:
+            frame = getattr(tables, name)
+            arrays[f'{name}_columns'] = np.asarray(frame.columns, dtype=str)
+            for i, column in enumerate(frame.columns):
+                values = frame[column]
+                if column in AXIS_COLUMNS:
+                    continue
+                if values.dtype.kind in 'OTU':
+                    codes, labels = pd.factorize(values)
+                    arrays[f'{name}_{i}'] = codes.astype(np.int32)
+                    arrays[f'{name}_{i}_labels'] = np.asarray(labels, dtype=str)
+                else:
+                    arrays[f'{name}_{i}'] = values.to_numpy()
+        temp = TempFile(path)
+        np.savez(temp, **arrays)
+        os.replace(temp, path)
+        span.Count(bytes=os.path.getsize(path))
+
+
+def LoadSnapshot(store, path='tables.npz'):
+    """Loads the tables of store from its snapshot, None if it is missing, of another version or stale"""
+    if not os.path.exists(path):
+        return None
+    with Span('load_snapshot'), np.load(path, allow_pickle=False) as archive:
+        if int(archive['version']) != SNAPSHOT_VERSION or str(archive['source']) != store.Hash():
+            return None
+        frames = {}
+        for name in SNAPSHOT_FRAMES:
+            columns = {}
+            for i, column in enumerate(archive[f'{name}_columns'].tolist()):
+                if column in AXIS_COLUMNS:
+                    columns[column] = None
+                elif f'{name}_{i}_labels' in archive.files:
+                    columns[column] = archive[f'{name}_{i}_labels'].astype(object)[archive[f'{name}_{i}']]
+                else:
+                    columns[column] = archive[f'{name}_{i}']
+            rows = next((len(values) for values in columns.values() if values is not None), 0)
+            countries = rows // len(store.Axis) if len(store.Axis) else 0
+            for column, values in AxisColumns(store.Axis, countries).items():
+                if column in columns:
+                    columns[column] = values
+            frames[name] = pd.DataFrame(columns)
+    return Tables(store, GenerateDailyData(store), store.Axis, frames['timeline'], frames['accumulated'],
+                  frames['latest'])
+
+
+def AxisColumns(axis, countries):
+    """The 'date' & 'Date' columns of a date major table holding countries rows per date, as Aggregate makes them"""
+    return {'date': np.repeat(axis.Keys, countries),
+            'Date': np.repeat(np.asarray(axis.Labels, dtype=object), countries)}
+
+
+def LoadTables(progress=None, path='tables.npz'):
+    """Loads the tables of the saved series from their snapshot, rebuilding it when it is missing or stale"""
+    progress = progress or (lambda message: None)
+    store = GetData()
+    tables = LoadSnapshot(store, path)
+    if tables is None:
+        progress("Tables Snapshot Missing Or Stale, Rebuilding")
+        tables = BuildTables(store, progress=progress)
+        SaveSnapshot(tables, path)
+    return tables
+
+
+def UpdateTables(tables=None, progress=None, path='tables.npz'):
+    """Downloads the feeds & brings tables & their snapshot up to date
+
+    Returns (feed results without payloads, tables).
+    """
+    progress = progress or (lambda message: None)
+    progress("Downloading Data")
+    with Span('download') as span:
+        results = [result._replace(payload=None) for result in UpdateData().values()]
+        span.Count(feeds=len(results), failed=sum(result.status == 'failed' for result in results))
+    progress("Getting Data")
+    updated = BuildTables(GetData(), tables, progress)
+    if updated is not tables:
+        SaveSnapshot(updated, path)
+    return results, updated
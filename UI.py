@@ -156,6 +156,10 @@ class Ui_MainWindow(object):
         self.Export = QtWidgets.QPushButton(self.groupBox)
         self.Export.setObjectName("Export")
         self.gridLayout.addWidget(self.Export, 1, 0, 1, 1)
+        self.Cancel = QtWidgets.QPushButton(self.groupBox)
+        self.Cancel.setEnabled(False)
+        self.Cancel.setObjectName("Cancel")
+        self.gridLayout.addWidget(self.Cancel, 2, 0, 1, 1)
         self.horizontalLayout_3.addWidget(self.groupBox)
         self.gridLayout_2.addLayout(self.horizontalLayout_3, 0, 0, 1, 1)
         self.browser = QtWebEngineWidgets.QWebEngineView(self.centralwidget)
@@ -205,4 +209,5 @@ class Ui_MainWindow(object):
         self.groupBox.setTitle(_translate("MainWindow", "Tools"))
         self.Update.setText(_translate("MainWindow", "Update Database"))
         self.Export.setText(_translate("MainWindow", "Export To Video File"))
+        self.Cancel.setText(_translate("MainWindow", "Cancel"))
 from PyQt5 import QtWebEngineWidgets
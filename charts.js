@@ -0,0 +1,176 @@
+// Builds the animated COVID19 charts client side from a columnar data payload
+// (see Charts.WritePayload): every column holds dates x countries values, date major.
+
+function Column(data, name, frame) {
+    var count = data.countries.length;
+    return data.columns[name].slice(frame * count, (frame + 1) * count);
+}
+
+function Max(values) {
+    var high = 0;
+    for (var i = 0; i < values.length; i++) {
+        high = Math.max(high, values[i]);
+    }
+    return high;
+}
+
+function Range(values, log) {
+    var low = Infinity, high = -Infinity;
+    values.forEach(function (value) {
+        if (log && value <= 0) {
+            return;
+        }
+        low = Math.min(low, value);
+        high = Math.max(high, value);
+    });
+    if (low === Infinity) {
+        return [0, 1];
+    }
+    return log ? [Math.log10(low) * 0.97, Math.log10(high) * 1.04] : [low * 0.7, high * 1.4];
+}
+
+function Controls(layout, names, prefix, redraw) {
+    layout.updatemenus = [{
+        buttons: [
+            {args: [null, {frame: {duration: 500, redraw: redraw}, fromcurrent: true,
+                           transition: {duration: 300, easing: 'quadratic-in-out'}}],
+             label: 'Play', method: 'animate'},
+            {args: [[null], {frame: {duration: 0, redraw: redraw}, mode: 'immediate', transition: {duration: 0}}],
+             label: 'Pause', method: 'animate'}
+        ],
+        direction: 'left', pad: {r: 10, t: 87}, showactive: false, type: 'buttons',
+        x: 0.1, xanchor: 'right', y: 0, yanchor: 'top'
+    }];
+    layout.sliders = [{
+        active: 0, yanchor: 'top', xanchor: 'left',
+        currentvalue: {font: {size: 20}, prefix: prefix, visible: true, xanchor: 'right'},
+        transition: {duration: 300, easing: 'cubic-in-out'},
+        pad: {b: 10, t: 50}, len: 0.9, x: 0.1, y: 0,
+        steps: names.map(function (name) {
+            return {args: [[name], {frame: {duration: 300, redraw: redraw}, mode: 'immediate',
+                                    transition: {duration: 300}}],
+                    label: name, method: 'animate'};
+        })
+    }];
+    return layout;
+}
+
+function BubbleChart(data, config) {
+    var all = data.columns;
+    var sizeref = 2 * Math.max(Max(all[config.size]), 1e-9) / (config.scale * Math.pow(80, 2));
+    var frames = data.keys.map(function (key, i) {
+        return {name: String(key), data: [{
+            x: Column(data, config.x, i), y: Column(data, config.y, i), text: data.countries, mode: 'markers',
+            type: 'scatter',
+            marker: {sizemode: 'area', sizeref: sizeref, size: Column(data, config.size, i),
+                     color: Column(data, config.color, i), colorscale: 'Viridis', showscale: true,
+                     cmin: 0, cmax: Max(all[config.color]),
+                     colorbar: {title: {text: config.colorbar_title}}}
+        }]};
+    });
+    var layout = {
+        title: {text: config.title}, hovermode: 'closest', showlegend: false,
+        xaxis: {title: {text: config.x_title}, type: 'log', autorange: false, range: Range(all[config.x], true)},
+        yaxis: {title: {text: config.y_title}, type: 'log', autorange: false, range: Range(all[config.y], true)}
+    };
+    return {frames: frames, layout: Controls(layout, frames.map(function (frame) { return frame.name; }),
+                                             'Year:', false)};
+}
+
+function BarChart(data, config) {
+    var frames = data.dates.map(function (label, i) {
+        var values = Column(data, config.y, i), confirmed = Column(data, 'confirmed', i),
+            deaths = Column(data, 'deaths', i), recovered = Column(data, 'recovered', i);
+        var x = [], y = [], customdata = [];
+        values.forEach(function (value, j) {
+            if (value !== 0) {
+                x.push(data.countries[j]);
+                y.push(value);
+                customdata.push([confirmed[j], deaths[j], recovered[j]]);
+            }
+        });
+        return {name: label, data: [{
+            type: 'bar', x: x, y: y, customdata: customdata, marker: {color: '#636efa'},
+            hovertemplate: 'country=%{x}<br>' + config.y + '=%{y}<br>confirmed=%{customdata[0]}<br>' +
+                           'deaths=%{customdata[1]}<br>recovered=%{customdata[2]}<extra></extra>'
+        }]};
+    });
+    var layout = {
+        xaxis: {title: {text: 'country'}, tickangle: -45, categoryorder: 'total descending'},
+        yaxis: {title: {text: config.y}, range: [0, Max(data.columns[config.y]) * 1.05]},
+        barmode: 'relative'
+    };
+    return {frames: frames, layout: Controls(layout, data.dates, 'Date=', true)};
+}
+
+function MapChart(data, config) {
+    var frames = data.dates.map(function (label, i) {
+        var confirmed = Column(data, 'confirmed', i), deaths = Column(data, 'deaths', i),
+            recovered = Column(data, 'recovered', i);
+        return {name: label, data: [{
+            type: 'choropleth', locationmode: 'country names', locations: data.countries, coloraxis: 'coloraxis',
+            z: Column(data, config.color, i), hovertext: data.countries,
+            customdata: confirmed.map(function (value, j) { return [value, deaths[j], recovered[j]]; }),
+            hovertemplate: '<b>%{hovertext}</b><br><br>confirmed=%{customdata[0]}<br>deaths=%{customdata[1]}' +
+                           '<br>recovered=%{customdata[2]}<extra></extra>'
+        }]};
+    });
+    var layout = {
+        geo: {projection: {type: 'miller'}, domain: {x: [0, 1], y: [0, 1]}},
+        coloraxis: {colorbar: {title: {text: config.color}}, cmin: 0,
+                    cmax: Max(data.columns[config.color]), colorscale: 'Plasma'}
+    };
+    return {frames: frames, layout: Controls(layout, data.dates, 'Date=', true)};
+}
+
+var CHARTS = {bubble: BubbleChart, bar: BarChart, map: MapChart};
+
+function Draw(id, data, config) {
+    var chart = CHARTS[config.type](data, config);
+    return Plotly.newPlot(id, chart.frames[0].data, chart.layout, {responsive: true}).then(function (gd) {
+        if (config.click) {
+            gd.on('plotly_click', function (d) {
+                var pt = (d.points || [])[0];
+                if (pt && window.backend) {
+                    window.backend.ShowCountryPlot(pt.location);
+                }
+            });
+        }
+        return Plotly.addFrames(gd, chart.frames);
+    });
+}
+
+// Menu switching the config fields in config.switch between the payload columns in config.metrics; the frames
+// are rebuilt from the already loaded payload
+function MetricMenu(id, data, config) {
+    var menu = document.createElement('select');
+    config.metrics.forEach(function (metric) {
+        var option = document.createElement('option');
+        option.value = option.text = metric;
+        option.selected = metric === config[config.switch[0]];
+        menu.appendChild(option);
+    });
+    menu.onchange = function () {
+        config.switch.forEach(function (field) {
+            config[field] = menu.value;
+        });
+        if (config.colorbar_title) {
+            config.colorbar_title = menu.value;
+        }
+        Plotly.purge(id);
+        Draw(id, data, config);
+    };
+    var chart = document.getElementById(id);
+    chart.parentNode.insertBefore(menu, chart);
+}
+
+function COVIDChart(id, config) {
+    fetch(config.data).then(function (response) {
+        return response.json();
+    }).then(function (data) {
+        if (config.metrics) {
+            MetricMenu(id, data, config);
+        }
+        return Draw(id, data, config);
+    });
+}
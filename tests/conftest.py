@@ -0,0 +1,38 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from FakeUpstream import FakeUpstream  # noqa: E402
+from SeriesStore import SeriesStore  # noqa: E402
+
+
+def Fixture(name):
+    """Path of a checked-in data file"""
+    return os.path.join(ROOT, name)
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """Runs the test inside an empty directory, the app reads & writes its files in the working one"""
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+@pytest.fixture(scope='session')
+def store():
+    """The store of the checked-in data.json"""
+    return SeriesStore.FromJSON(Fixture('data.json'))
+
+
+@pytest.fixture
+def upstream():
+    """A FakeUpstream of the checked-in data on a free port, yields (upstream, UpdateData/Feeds url kwargs)"""
+    fake = FakeUpstream(Fixture('data.json'), Fixture('latest.json'), Fixture('Summary.json'))
+    httpd, url = fake.Serve()
+    yield fake, {'tracker': url, 'heroku': url + '/', 'summary': url + '/'}
+    httpd.shutdown()
+    httpd.server_close()
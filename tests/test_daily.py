@@ -0,0 +1,52 @@
+import numpy as np
+
+from DataDownload import GenerateDailyData
+from SeriesStore import SeriesStore
+from conftest import Fixture
+
+
+def Differences(timeline):
+    """The old GenerateDailyData loop over one timeline"""
+    daily = []
+    previous = 0
+    for value in timeline:
+        daily.append(max(value - previous, 0))
+        previous = value
+    return daily
+
+
+def test_parity_with_daily_json(store):
+    daily = GenerateDailyData(store)
+    expected = SeriesStore.FromJSON(Fixture('daily.json'))
+    np.testing.assert_array_equal(daily.Dates, expected.Dates)
+    np.testing.assert_array_equal(daily.Confirmed, expected.Confirmed)
+    np.testing.assert_array_equal(daily.Deaths, expected.Deaths)
+    # daily.json differenced the recovered timelines in the feed's key order, which isn't the date order
+    np.testing.assert_array_equal(daily.Recovered, [Differences(row) for row in store.Recovered.tolist()])
+    assert daily.Locations is store.Locations
+    assert daily.Axis is store.Axis
+
+
+def Store(*rows):
+    dates = [f'2020-03-{day:02d}T00:00:00Z' for day in range(1, len(rows[0]) + 1)]
+    series = {metric: np.array(rows, dtype=np.int64) for metric in ('confirmed', 'deaths', 'recovered')}
+    return SeriesStore(dates, {'country': np.array(['A', 'B'][:len(rows)])}, series)
+
+
+def test_corrections_are_clamped():
+    daily = GenerateDailyData(Store([0, 5, 3, 10]))
+    np.testing.assert_array_equal(daily.Confirmed, [[0, 5, 0, 7]])
+
+
+def test_window():
+    daily = GenerateDailyData(Store([2, 6, 12, 20, 30], [0, 0, 3, 3, 9]), window=3)
+    assert set(daily.Series) == {'confirmed', 'deaths', 'recovered',
+                                 'confirmed_avg', 'deaths_avg', 'recovered_avg'}
+    np.testing.assert_allclose(daily.Series['confirmed_avg'], [[2, 3, 4, 6, 8], [0, 0, 1, 1, 3]])
+
+
+def test_growth():
+    daily = GenerateDailyData(Store([0, 4, 6, 6, 9]), growth=True)
+    assert set(daily.Series) == {'confirmed', 'deaths', 'recovered',
+                                 'confirmed_growth', 'deaths_growth', 'recovered_growth'}
+    np.testing.assert_allclose(daily.Series['confirmed_growth'], [[0, 0, 50, 0, 50]])
@@ -0,0 +1,54 @@
+import time
+
+import pandas as pd
+import pytest
+
+from DateAxis import DateAxis
+from SeriesStore import SeriesStore
+from Tables import BuildTables
+from conftest import Fixture
+
+# POSIX TZ strings, so no tz database is needed: UTC, US Eastern, Samoa (UTC-11), Line Islands (UTC+14), India
+ZONES = ['UTC0', 'EST5EDT,M3.2.0,M11.1.0', 'SST11', 'LINT-14', 'IST-5:30']
+
+
+@pytest.fixture
+def zone(request, monkeypatch):
+    monkeypatch.setenv('TZ', request.param)
+    time.tzset()
+    yield request.param
+    monkeypatch.undo()
+    time.tzset()
+
+
+@pytest.fixture(scope='module')
+def expected():
+    """Tables of the checked-in data.json, built under UTC"""
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setenv('TZ', 'UTC0')
+        time.tzset()
+        tables = BuildTables(SeriesStore.FromJSON(Fixture('data.json')))
+    time.tzset()
+    return tables
+
+
+@pytest.mark.parametrize('zone', ZONES, indirect=True)
+def test_axis(zone):
+    axis = DateAxis(['2019-12-31T00:00:00Z', '2020-01-01T00:00:00Z', '2020-02-29T00:00:00Z',
+                     '2020-03-01T00:00:00Z'])
+    assert axis.Keys.tolist() == [191231, 200101, 200229, 200301]
+    assert axis.Labels == ['31-December-19', '01-January-20', '29-February-20', '01-March-20']
+    assert axis.RecoveredKeys == ['12/31/19', '1/1/20', '2/29/20', '3/1/20']
+
+
+@pytest.mark.parametrize('zone', ZONES, indirect=True)
+def test_tables(zone, expected):
+    tables = BuildTables(SeriesStore.FromJSON(Fixture('data.json')))
+    axis = tables.axis
+    assert (axis.Keys[0], axis.Labels[0], axis.RecoveredKeys[0]) == (200122, '22-January-20', '1/22/20')
+    assert (axis.Keys[-1], axis.Labels[-1], axis.RecoveredKeys[-1]) == (200530, '30-May-20', '5/30/20')
+    assert axis.RecoveredKeys == expected.axis.RecoveredKeys
+    for name in ('timeline', 'accumulated', 'latest'):
+        pd.testing.assert_frame_equal(getattr(tables, name), getattr(expected, name))
+    assert tables.timeline['date'].unique().tolist() == axis.Keys.tolist()
+    assert tables.timeline['Date'].unique().tolist() == axis.Labels
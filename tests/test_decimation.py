@@ -0,0 +1,26 @@
+import numpy as np
+
+from Decimation import DETAIL, FrameDates
+
+
+def test_short_histories_keep_every_date():
+    np.testing.assert_array_equal(FrameDates(120, DETAIL['Bubble']), np.arange(120))
+
+
+def test_frame_budget():
+    detail = DETAIL['Bubble']
+    for count in (121, 300, 1000, 3000):
+        positions = FrameDates(count, detail)
+        assert len(positions) <= detail.frames
+        assert positions[0] == 0
+        np.testing.assert_array_equal(positions[-detail.recent:], np.arange(count - detail.recent, count))
+        assert np.all(np.diff(positions) > 0)
+
+
+def test_keyframes_stay_in_place():
+    """A new date adds its own frame only, until the keyframes are spread to a longer stride"""
+    detail = DETAIL['Bubble']
+    for count in range(detail.frames, 790):
+        shown = set(FrameDates(count, detail).tolist())
+        added = set(FrameDates(count + 1, detail).tolist()) - shown
+        assert added == {count}, count
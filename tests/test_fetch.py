@@ -0,0 +1,80 @@
+import os
+
+from Build import ReportFeeds
+from DataDownload import Feeds, UpdateData
+from Fetch import FeedFetcher
+
+
+def test_retries(workdir, upstream):
+    fake, urls = upstream
+    fake.Fail('/latest', 2)
+    fake.Fail('/summary', 1, 429)
+    results = FeedFetcher(backoff=0).Fetch(Feeds(**urls).values())
+    assert {name: result.status for name, result in results.items()} == {
+        'locations': 'fetched', 'recovered': 'fetched', 'latest': 'fetched', 'summary': 'fetched'}
+    assert results['latest'].attempts == 3
+    assert results['summary'].attempts == 2
+    assert results['locations'].attempts == 1
+    assert len(results['locations'].payload) == 266
+
+
+def test_retries_exhausted(workdir, upstream):
+    fake, urls = upstream
+    fake.Fail('/latest', 10, 500)
+    fake.Fail('/summary', 10, 404)
+    results = FeedFetcher(retries=2, backoff=0).Fetch(Feeds(**urls).values())
+    assert results['latest'].status == 'failed'
+    assert results['latest'].attempts == 3
+    assert results['latest'].error == 'HTTP 500'
+    assert results['summary'].status == 'failed'
+    assert results['summary'].attempts == 1
+    assert results['locations'].status == 'fetched'
+
+
+def test_not_modified(workdir, upstream):
+    fake, urls = upstream
+    UpdateData(fetcher=FeedFetcher(backoff=0), **urls)
+    modified = os.path.getmtime('data.npz')
+    fake.requests.clear()
+    results = UpdateData(fetcher=FeedFetcher(backoff=0), **urls)
+    assert {result.status for result in results.values()} == {'not-modified'}
+    assert all(result.payload is None for result in results.values())
+    assert os.path.getmtime('data.npz') == modified
+    assert sorted(fake.requests) == ['/latest', '/recovered', '/summary', '/v2/locations']
+
+
+def test_one_feed_modified(workdir, upstream):
+    """The locations & recovered feeds are merged together, an unchanged one is fetched again in full"""
+    fake, urls = upstream
+    UpdateData(fetcher=FeedFetcher(backoff=0), **urls)
+    fetcher = FeedFetcher(backoff=0)
+    fetcher.validators.pop('recovered')
+    fake.requests.clear()
+    results = UpdateData(fetcher=fetcher, **urls)
+    assert results['locations'].status == 'fetched'
+    assert results['recovered'].status == 'fetched'
+    assert fake.requests.count('/v2/locations') == 2
+    assert 'recovered' in fetcher.validators
+
+
+def test_failed_feed(workdir, upstream):
+    fake, urls = upstream
+    fake.Fail('/v2/locations', 10)
+    fetcher = FeedFetcher(retries=1, backoff=0)
+    results = UpdateData(fetcher=fetcher, **urls)
+    assert results['locations'].status == 'failed'
+    assert results['latest'].status == 'fetched'
+    assert not os.path.exists('data.npz')
+    assert 'locations' not in fetcher.validators
+    assert 'recovered' not in fetcher.validators
+    assert os.path.exists('Latest.json')
+
+
+def test_report_feeds(workdir, upstream):
+    fake, urls = upstream
+    fake.Fail('/recovered', 10)
+    results = UpdateData(fetcher=FeedFetcher(retries=0, backoff=0), **urls)
+    messages = []
+    assert not ReportFeeds(results.values(), lambda message, type=20: messages.append((message, type)))
+    assert messages == [(f"Downloading recovered Failed: {results['recovered'].error}", 30)]
+    assert ReportFeeds([results['latest']], lambda message, type=20: messages.append(message))
@@ -0,0 +1,45 @@
+import os
+import threading
+
+import cv2
+import pytest
+
+from Build import Engine, NativeVideo
+from Export import PLOTS
+from Jobs import Job
+from Tables import BuildTables
+
+
+@pytest.fixture(scope='module')
+def indexes(store):
+    timeline, accumulated = Engine.Indexes(BuildTables(store))
+    return {'TimelineIndex': timeline, 'AccumulatedIndex': accumulated}
+
+
+def Export(job, plot, filename, index, times):
+    return job.RunProcess(NativeVideo, plot, filename, index, times, cooperative=True)
+
+
+def test_native_video_in_worker(workdir, store, indexes):
+    times = store.Axis.Keys[:10]
+    job = Job(Export, 'Bubble', 'bubble.avi', indexes[PLOTS['Bubble'].index], times)
+    written = []
+    job.signals.finished.connect(written.append)
+    job.run()
+    assert written == [10]
+    video = cv2.VideoCapture('bubble.avi')
+    assert int(video.get(cv2.CAP_PROP_FRAME_COUNT)) == 9 * 4 + 1  # 4 tweened frames between each two dates
+    video.release()
+    assert os.listdir('.') == ['bubble.avi']
+
+
+def test_cancelled_native_video_leaves_no_file(workdir, store, indexes):
+    job = Job(Export, 'BarCases', 'bars.avi', indexes[PLOTS['BarCases'].index], store.Axis.Keys)
+    cancelled = []
+    job.signals.cancelled.connect(lambda: cancelled.append(True))
+    timer = threading.Timer(3, job.Cancel)
+    timer.start()
+    job.run()
+    timer.cancel()
+    assert cancelled == [True]
+    assert os.listdir('.') == []
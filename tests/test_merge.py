@@ -0,0 +1,66 @@
+import json
+
+import numpy as np
+import pytest
+
+from DataDownload import MergeRecovered, ParseRecovered
+from SeriesStore import SeriesStore
+
+
+class Response(object):
+    """A streamed response of payload"""
+
+    def __init__(self, payload):
+        self.content = json.dumps(payload).encode()
+
+    def iter_content(self, size):
+        for start in range(0, len(self.content), size):
+            yield self.content[start:start + size]
+
+
+@pytest.fixture
+def copy(store):
+    """A store of the checked-in data the test may write into"""
+    return SeriesStore(store.Dates, {key: values.copy() for key, values in store.Locations.items()},
+                       {metric: values.copy() for metric, values in store.Series.items()}, store.Axis)
+
+
+def Row(store, country, province=''):
+    return np.flatnonzero((store.Locations['country'] == country) & (store.Locations['province'] == province))[0]
+
+
+def Recovered(records):
+    return ParseRecovered(Response({'locations': records}))
+
+
+def test_merge_report(copy):
+    keys = copy.Axis.RecoveredKeys
+    history = dict(zip(keys, range(len(keys))))
+    report = MergeRecovered(copy, Recovered([
+        {'country': 'Canada', 'province': 'Alberta', 'latest': 7, 'history': history},
+        {'country': 'Canada', 'province': 'Alberta', 'latest': 8, 'history': history},
+        {'country': 'Atlantis', 'province': 'nan', 'latest': 1, 'history': history}]))
+    assert report.matched == 1
+    assert report.unmatched_feed == [('Atlantis', '')]
+    assert report.duplicates == [('Canada', 'Alberta')]
+    assert len(report.unmatched_locations) == len(copy) - 1
+    assert all(type(country) is str and type(province) is str
+               for country, province in report.unmatched_locations)
+    row = Row(copy, 'Canada', 'Alberta')
+    np.testing.assert_array_equal(copy.Recovered[row], np.arange(len(keys)))
+    assert copy.Locations['latest_recovered'][row] == 7
+
+
+@pytest.mark.parametrize('empty_first', [True, False])
+def test_histories_are_read_through_their_own_keys(copy, empty_first):
+    """Neither the record order nor another record's dates decide how a history is read"""
+    keys = copy.Axis.RecoveredKeys
+    records = [{'country': 'Italy', 'province': 'nan', 'latest': 5, 'history': {keys[0]: 1, keys[1]: 2}},
+               {'country': 'France', 'province': 'nan', 'latest': 0, 'history': {keys[2]: 3, keys[1]: 2}}]
+    empty = {'country': 'Germany', 'province': 'nan', 'latest': 0, 'history': {}}
+    recovered = Recovered([empty] + records if empty_first else records + [empty])
+    assert len(recovered.keys) == 3
+    MergeRecovered(copy, recovered)
+    assert not copy.Locations['has_recovered'][Row(copy, 'Germany')]
+    np.testing.assert_array_equal(copy.Recovered[Row(copy, 'Italy')][:4], [1, 2, 0, 0])
+    np.testing.assert_array_equal(copy.Recovered[Row(copy, 'France')][:4], [0, 2, 3, 0])
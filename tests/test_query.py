@@ -0,0 +1,21 @@
+import json
+
+from Indicators import INDICATORS
+from Query import SeriesQuery
+from Tables import BuildTables
+
+
+def test_indicators_are_cumulative_fields(store):
+    query = SeriesQuery(BuildTables(store))
+    fields = query.Countries()['fields']
+    assert not set(INDICATORS) & set(fields['daily'])
+    assert set(INDICATORS) <= set(fields['cumulative'])
+
+    status, content, etag = query.Answer('/api/series', {'country': ['Italy'], 'to': ['2020-04-01']})
+    assert status == 200
+    assert list(json.loads(content)['countries']['Italy']) == fields['daily']
+    status, content, etag = query.Answer('/api/series', {'country': ['Italy'], 'fields': ['cfr_lagged']})
+    assert (status, json.loads(content)) == (400, {'error': "Unknown fields cfr_lagged"})
+    status, content, etag = query.Answer('/api/series', {'country': ['Italy'], 'fields': ['cfr_lagged'],
+                                                         'metric': ['cumulative']})
+    assert status == 200
@@ -0,0 +1,29 @@
+import os
+
+from Scheduler import BuildScheduler, BuildTask
+
+
+def Write(path, text):
+    with open(path, 'w') as outfile:
+        outfile.write(text)
+
+
+def Fail(path):
+    raise ValueError(path)
+
+
+def Crash(path):
+    os._exit(1)
+
+
+def test_failures_are_isolated(workdir):
+    tasks = [BuildTask('a.txt', 'A', Write, ('a.txt', 'a')),
+             BuildTask('crash.txt', 'Crash', Crash, ('crash.txt',)),
+             BuildTask('fail.txt', 'Fail', Fail, ('fail.txt',)),
+             BuildTask('b.txt', 'B', Write, ('b.txt', 'b'))]
+    results = {result.artifact: result for result in BuildScheduler(workers=2).Run(tasks)}
+    assert {artifact: result.status for artifact, result in results.items()} == {
+        'a.txt': 'done', 'crash.txt': 'failed', 'fail.txt': 'failed', 'b.txt': 'done'}
+    assert 'BrokenProcessPool' in results['crash.txt'].error
+    assert 'ValueError' in results['fail.txt'].error
+    assert open('a.txt').read() == 'a' and open('b.txt').read() == 'b'
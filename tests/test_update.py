@@ -0,0 +1,72 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from DataDownload import GetData, UpdateData
+from Fetch import FeedFetcher
+from SeriesStore import SeriesStore
+from Tables import BuildTables, LoadSnapshot, SaveSnapshot
+
+
+def AssertSameTables(tables, expected):
+    for name in ('timeline', 'accumulated'):
+        pd.testing.assert_frame_equal(getattr(tables, name), getattr(expected, name))
+
+
+def test_incremental_update(workdir, upstream):
+    fake, urls = upstream
+    fake.SetDays(120)
+    UpdateData(fetcher=FeedFetcher(backoff=0), **urls)
+    tables = BuildTables(GetData())
+    assert len(tables.store.Dates) == 120
+
+    fake.SetDays(125)
+    UpdateData(fetcher=FeedFetcher(backoff=0), **urls)
+    store = GetData()
+    assert len(store.Dates) == 125
+    np.testing.assert_array_equal(store.Confirmed[:, :120], tables.store.Confirmed)
+    updated = BuildTables(store, tables)
+    AssertSameTables(updated, BuildTables(store))
+
+    modified = os.path.getmtime('data.npz')
+    results = UpdateData(fetcher=FeedFetcher(backoff=0), **urls)
+    assert results['locations'].status == 'not-modified'
+    assert os.path.getmtime('data.npz') == modified
+    assert BuildTables(GetData(), updated) is updated
+
+
+def test_incremental_update_with_new_recovered_location(store):
+    """A location gaining a recovered series changes the countries of every date, so the tables are rebuilt"""
+    locations = {key: values.copy() for key, values in store.Locations.items()}
+    row = np.flatnonzero(locations['has_recovered'])[0]
+    locations['has_recovered'][row] = False
+    old = store.Slice(0, 120)
+    tables = BuildTables(SeriesStore(old.Dates, locations, old.Series, old.Axis))
+    AssertSameTables(BuildTables(store, tables), BuildTables(store))
+
+
+def test_snapshot(workdir, store):
+    tables = BuildTables(store)
+    SaveSnapshot(tables, 'tables.npz')
+    loaded = LoadSnapshot(store, 'tables.npz')
+    for name in ('timeline', 'accumulated', 'latest'):
+        pd.testing.assert_frame_equal(getattr(loaded, name), getattr(tables, name))
+    assert LoadSnapshot(store.Slice(0, 120), 'tables.npz') is None
+
+
+def test_corrected_past_value(workdir, upstream):
+    """Upstream revising a day that is already stored replaces the stored series & rebuilds the tables"""
+    fake, urls = upstream
+    fake.SetDays(120)
+    UpdateData(fetcher=FeedFetcher(backoff=0), **urls)
+    tables = BuildTables(GetData())
+
+    timeline = fake.locations[0]['timelines']['confirmed']['timeline']
+    date = list(timeline)[100]
+    timeline[date] += 50
+    fake.SetDays(125)
+    UpdateData(fetcher=FeedFetcher(backoff=0), **urls)
+    store = GetData()
+    assert store.Confirmed[0, 100] == tables.store.Confirmed[0, 100] + 50
+    AssertSameTables(BuildTables(store, tables), BuildTables(store))